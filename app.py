@@ -14,19 +14,42 @@ convert script to executable
   pyinstaller -n="NetCalculator" -w --onefile --add-data="img;img" --icon=img/logo_ctu_cz.ico app.py
 - folder build (quicker start when run): pyinstaller build-folder.spec
   pyinstaller -n="NetCalculator" -w --add-data="img;img" --icon=img/logo_ctu_cz.ico app.py
+
+startup trace (timestamps of the launch phases in JSON file): NETCALC_STARTUP_TRACE=trace.json or app.py --startup-trace trace.json
 """
+import app_trace # first, the startup trace (when turned on) measures all the imports
+app_trace.enable_from_environment()
+
+import functools
 import os
+import sqlite3
 from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox
 from PyQt6.QtGui import QIcon, QPixmap
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QEvent, QTimer
+app_trace.mark("pyqt_imported")
 
 from app_gui import Ui_AppMainWindow # UI created in QtDesigner: pyuic6 .\calculator-gui.ui -o app_gui.py
+app_trace.mark("app_gui_imported")
 import app_calc as ac
+import app_graph as ag
+import app_worker as aw
+app_trace.mark("app_calc_imported")
 #import locale
 #locale.setlocale(locale.LC_ALL, "cs_CZ") # not working??
 
 basedir = os.path.dirname(__file__)
 
+COMPUTING_STATE_DELAY = 150 # [ms] delay of showing the "computing" state of outputs waiting for results
+# [ms] pause in typing after which the typed value is recalculated (0 = recalculation on every keystroke)
+try:
+    INPUT_QUIET_PERIOD = max(int(os.environ.get("NETCALC_INPUT_QUIET_PERIOD", 300)), 0)
+except ValueError:
+    INPUT_QUIET_PERIOD = 300 # malformed value, app works with the default
+# breakdown of the last recalculation (lambda searches, their cdf evaluations and times) in the status bar
+SOLVER_DIAGNOSTICS = os.environ.get("NETCALC_SOLVER_DIAGNOSTICS", "0") != "0"
+# keys changing spinbox value in steps (or confirming it), their changes are recalculated immediately
+STEPPING_KEYS = (Qt.Key.Key_Up, Qt.Key.Key_Down, Qt.Key.Key_PageUp, Qt.Key.Key_PageDown, Qt.Key.Key_Return, Qt.Key.Key_Enter)
+
 # Windows - unique application id for icon showing on the taskbar
 try:
     from ctypes import windll  # Only exists on Windows.
@@ -44,6 +67,7 @@ class CalculatorMainWindow(QMainWindow):
         # use the class for UI (prepared in QtDesigner and generated by pyuic from .ui file)
         self.ui = Ui_AppMainWindow()
         self.ui.setupUi(self)
+        app_trace.mark("setup_ui")
 
         #self.setWindowTitle("CTO Net Capacity Impact Calculator") # rewrite window title
         self.setWindowIcon(QIcon(os.path.join(basedir, "img/logo_ctu_cz.ico")))
@@ -51,188 +75,254 @@ class CalculatorMainWindow(QMainWindow):
         ## INTRO SECTION
         logo_pixmap = QPixmap( os.path.join(basedir, "img/logo_ctu_cz_cb.png") )
         self.ui.logo.setPixmap( logo_pixmap.scaled(self.ui.logo.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation) )
+        app_trace.mark("logo_scaled")
 
         ## SECTION A
-        # handling of input values relation: capacity >= nbr_max > nbr_avg
-        self.ui.capacity.valueChanged.connect(self.check_values_relations_capacity)
-        self.ui.nbr_max.valueChanged.connect(self.check_values_relations_nbr)
-        self.ui.nbr_max.valueChanged.connect(self.check_values_relations_capacity) # also this relation can change
-        self.ui.nbr_avg.valueChanged.connect(self.check_values_relations_nbr)
-        self.ui.nbr_avg.valueChanged.connect(self.check_values_relations_capacity) # also this relation can change
-        
         # handling of incomplete input triggering calculations
         self.ui.capacity.setKeyboardTracking(False)
         self.ui.nbr_max.setKeyboardTracking(False)
         self.ui.nbr_avg.setKeyboardTracking(False)
 
-        ## SECTION B
-        
-        # handling of Maximal Link Utilization
-        self.ui.out_lu_max.append( ac.prepare_LU_max(capacity_L1=self.ui.capacity.value(), nbr_max=self.ui.nbr_max.value()) ) # initial value setting
-        self.ui.capacity.valueChanged.connect(self.update_LU_max) # immediate value updating
-        self.ui.nbr_max.valueChanged.connect(self.update_LU_max) # immediate value updating
-        
-        # handling of Average Link Utilization
-        self.ui.out_lu_avg.append( ac.prepare_LU_avg(capacity_L1=self.ui.capacity.value(), nbr_avg=self.ui.nbr_avg.value()) )
-        self.ui.capacity.valueChanged.connect(self.update_LU_avg)
-        self.ui.nbr_avg.valueChanged.connect(self.update_LU_avg)
-
-        # handling of Utilization Factor
-        self.ui.out_uf.append( ac.prepare_UF(nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value()) )
-        self.ui.nbr_max.valueChanged.connect(self.update_UF)
-        self.ui.nbr_avg.valueChanged.connect(self.update_UF)
+        ## SECTIONS B, D, E
+        # all outputs are nodes of one dependency graph (app_graph), every input change recalculates only the affected
+        # intermediate values (each once); the calculation runs in background thread (app_worker), so GUI does not freeze
+        # during long lambda searching, results of inputs changed meanwhile are dropped
+        self.worker = aw.CalculationWorker(self, diagnostics=SOLVER_DIAGNOSTICS)
+        self.worker.finished.connect(self.show_results)
+        if SOLVER_DIAGNOSTICS:
+            self.worker.diagnosed.connect(self.show_diagnostics)
         
-        ## SECTION D
-        
-        # handling of SDR value (RSA - Real Speed Achieved) without Utilization Factor
-        self.ui.out_sdr_noUF.append( ac.prepare_RSA_noUF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                         agg=self.ui.agg.value(), prob=(self.extract_probability_value()/100)) )
-        self.ui.capacity.valueChanged.connect(self.update_RSA_noUF)
-        self.ui.mtu.valueChanged.connect(self.update_RSA_noUF)
-        self.ui.ipheader.currentTextChanged.connect(self.update_RSA_noUF)
-        self.ui.agg.valueChanged.connect(self.update_RSA_noUF)
-        self.ui.probability.currentTextChanged.connect(self.update_RSA_noUF)
-                              
-        # handling of SDR value (RSA - Real Speed Achieved) with Utilization Factor
-        self.ui.out_sdr_UF.append( ac.prepare_RSA_UF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                     agg=self.ui.agg.value(), nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(),
-                                                     prob=(self.extract_probability_value()/100)) )
-        self.ui.capacity.valueChanged.connect(self.update_RSA_UF)
-        self.ui.mtu.valueChanged.connect(self.update_RSA_UF)
-        self.ui.ipheader.currentTextChanged.connect(self.update_RSA_UF)
-        self.ui.agg.valueChanged.connect(self.update_RSA_UF)
-        self.ui.probability.currentTextChanged.connect(self.update_RSA_UF)
-        self.ui.nbr_max.valueChanged.connect(self.update_RSA_UF)
-        self.ui.nbr_avg.valueChanged.connect(self.update_RSA_UF) # no impact in output field ("eliminated" in calculation)????
-        
-        """
-        # removed
-        # handling of SDR value (RSA - Real Speed Achieved) with natural aggregation impact
-        self.ui.out_sdr_agg.append( ac.prepare_RSA_agg(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                       agg=self.ui.agg.value()) )
-        self.ui.capacity.valueChanged.connect(self.update_RSA_agg)
-        self.ui.mtu.valueChanged.connect(self.update_RSA_agg)
-        self.ui.ipheader.currentTextChanged.connect(self.update_RSA_agg)
-        self.ui.agg.valueChanged.connect(self.update_RSA_agg)
-        """
-        """
-        # remowed (aggregation has no impact on bandwidth at NTP)
-        # handling of bandwidth without Utilization Factor
-        self.ui.out_bandwidth_noUF.append( ac.prepare_BW_noUF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                              agg=self.ui.agg.value(), prob=(self.extract_probability_value()/100)) )
-        self.ui.capacity.valueChanged.connect(self.update_BW_noUF)
-        self.ui.mtu.valueChanged.connect(self.update_BW_noUF)
-        self.ui.ipheader.currentTextChanged.connect(self.update_BW_noUF)
-        self.ui.agg.valueChanged.connect(self.update_BW_noUF)
-        self.ui.probability.currentTextChanged.connect(self.update_BW_noUF)
-        
-        # handling of bandwidth with Utilization Factor
-        self.ui.out_bandwidth_UF.append( ac.prepare_BW_UF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                          nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(),
-                                                          agg=self.ui.agg.value(), prob=(self.extract_probability_value()/100)) )
-        self.ui.capacity.valueChanged.connect(self.update_BW_UF)
-        self.ui.mtu.valueChanged.connect(self.update_BW_UF)
-        self.ui.ipheader.currentTextChanged.connect(self.update_BW_UF)
-        self.ui.agg.valueChanged.connect(self.update_BW_UF)
-        self.ui.probability.currentTextChanged.connect(self.update_BW_UF)
-        """
         ## SECTION E
+        # goal seek: the largest aggregation still meeting the required SDR (E.1), planners do not need to try agg by hand
+        # (searched in the background thread as well)
+        self.ui.goal_seek.clicked.connect(self.seek_max_aggregation)
+        self.worker.goal_sought.connect(self.show_max_aggregation)
+        
+        # input values: GUI fields, reading of their values and signals of their changes
+        self.inputs = {
+            "capacity_L1": (self.ui.capacity, self.ui.capacity.value, self.ui.capacity.valueChanged),
+            "mtu": (self.ui.mtu, self.ui.mtu.value, self.ui.mtu.valueChanged),
+            "ipheader": (self.ui.ipheader, self.extract_ipheader_value, self.ui.ipheader.currentTextChanged),
+            "agg": (self.ui.agg, self.ui.agg.value, self.ui.agg.valueChanged),
+            "nbr_max": (self.ui.nbr_max, self.ui.nbr_max.value, self.ui.nbr_max.valueChanged),
+            "nbr_avg": (self.ui.nbr_avg, self.ui.nbr_avg.value, self.ui.nbr_avg.valueChanged),
+            "prob": (self.ui.probability, lambda: self.extract_probability_value()/100, self.ui.probability.currentTextChanged),
+            "rsa_req": (self.ui.sdr_req, self.ui.sdr_req.value, self.ui.sdr_req.valueChanged),
+        }
+        # output fields of the graph outputs
+        self.output_fields = {
+            "LU_max": self.ui.out_lu_max,
+            "LU_avg": self.ui.out_lu_avg,
+            "UF": self.ui.out_uf,
+            "RSA_noUF": self.ui.out_sdr_noUF, # SDR value (RSA - Real Speed Achieved)
+            "RSA_UF": self.ui.out_sdr_UF,
+            "NTP_noUF": self.ui.out_ntp_noUF, # average NTP (Net Termination Points)
+            "NTP_UF": self.ui.out_ntp_UF,
+            "perf_decrease_noUF": self.ui.out_perf_noUF, # decrease of service performance
+            "perf_decrease_UF": self.ui.out_perf_UF,
+            "BW_min": self.ui.out_bandwidth_min, # bandwidth needed
+            "capacity_min": self.ui.out_capacity_min, # capacity needed
+        }
+        self.output_texts = {} # texts shown in output fields
+        
+        # "computing" state (grey old value) of the outputs waiting for results, shown only when the calculation
+        # takes longer than COMPUTING_STATE_DELAY (no flickering with quick calculations)
+        self.pending_outputs = set()
+        self.provisional_outputs = set() # preliminary values which the final results can still change (in italics)
+        self.computing_timer = QTimer(self)
+        self.computing_timer.setSingleShot(True)
+        self.computing_timer.setInterval(COMPUTING_STATE_DELAY)
+        self.computing_timer.timeout.connect(self.show_computing_state)
+        
+        # coalescing of input changes: values typed on keyboard (spinboxes of agg, mtu and sdr_req emit a change on every
+        # keystroke) are recalculated after INPUT_QUIET_PERIOD without further changes, all changes of any inputs made
+        # meanwhile are merged into one recalculation; arrow clicks/keys, mouse wheel, Enter and ComboBoxes are immediate
+        self.changed_inputs = set()
+        self.keyboard_editing = None # spinbox being edited by typing
+        self.input_timer = QTimer(self)
+        self.input_timer.setSingleShot(True)
+        self.input_timer.setInterval(INPUT_QUIET_PERIOD)
+        self.input_timer.timeout.connect(self.flush_inputs)
+        
+        self.input_values = {name: read() for name, (field, read, signal) in self.inputs.items()}
+        # initial values are calculated when the event loop runs (after the window is shown), the first calculation
+        # imports the numerical libraries (app_calc.import_numerics) and would delay the window otherwise
+        QTimer.singleShot(0, self.calculate_initial_values)
+        for name, (field, read, signal) in self.inputs.items():
+            signal.connect(functools.partial(self.input_changed, name)) # value updating
+            field.installEventFilter(self) # recognition of typing
+        self.painted = False # first frame (for the startup trace)
+        app_trace.mark("window_created")
+    
+    def calculate_initial_values(self):
+        app_trace.mark("initial_calculation_started")
+        self.recalculate(self.inputs)
+    
+    def paintEvent(self, event):
+        if not self.painted:
+            self.painted = True
+            app_trace.mark("first_frame")
+        super().paintEvent(event)
+        
+    def eventFilter(self, watched, event):
+        """ Recognizes whether the next change of a spinbox value comes from typing or from stepping. """
+        if event.type() == QEvent.Type.KeyPress:
+            self.keyboard_editing = watched if event.key() not in STEPPING_KEYS else None
+        elif event.type() in (QEvent.Type.MouseButtonPress, QEvent.Type.Wheel):
+            self.keyboard_editing = None
+        
+        return super().eventFilter(watched, event)
+    
+    def input_changed(self, name, *signal_args):
+        """ Get changed input value from GUI field, recalculation starts immediately or after the typing pause. """
+        field, read, signal = self.inputs[name]
+        self.input_values[name] = read()
+        self.changed_inputs.add(name)
+        
+        if field is self.keyboard_editing and INPUT_QUIET_PERIOD > 0:
+            self.input_timer.start() # (re)started by every keystroke
+        else:
+            self.flush_inputs()
+    
+    def flush_inputs(self):
+        """ Starts one recalculation for all the input changes collected so far. """
+        self.input_timer.stop()
+        changed_inputs, self.changed_inputs = self.changed_inputs, set()
+        if not changed_inputs:
+            return
+        
+        if not changed_inputs.isdisjoint(("capacity_L1", "nbr_max", "nbr_avg")):
+            self.check_values_relations() # handling of input values relation: capacity >= nbr_max > nbr_avg
+        self.recalculate(changed_inputs)
+    
+    def recalculate(self, changed_inputs):
+        """ Submits the current input values to the background calculation, outputs depending on the changed inputs are pending. """
+        self.worker.submit(self.input_values)
+        self.pending_outputs.update(self.worker.graph.dependent_outputs(changed_inputs))
+        if not self.computing_timer.isActive():
+            self.computing_timer.start()
+    
+    def show_computing_state(self):
+        """ Greys out values of the outputs waiting for results. """
+        for name in self.pending_outputs:
+            field = self.output_fields[name]
+            field.setStyleSheet("color: gray;")
+            field.setToolTip("Počítá se…")
+    
+    def show_results(self, generation, outputs, final, provisional):
+        """ Writes results of the background calculation into output fields (results of superseded inputs are dropped).
+        Preliminary (coarse precision) results are replaced by the final ones only where the shown text differs,
+        the provisional ones (shown digits not certain with the coarse lambdas) are marked till then. """
+        if not self.worker.is_current(generation):
+            return
+        if app_trace.active():
+            if final:
+                app_trace.finish("final_results") # end of the startup trace
+            else:
+                app_trace.mark("first_results")
+        for name, value in outputs.items():
+            text = self.worker.graph.format(name, value)
+            field = self.output_fields[name]
+            if self.output_texts.get(name) != text: # only changed fields are refreshed
+                self.output_texts[name] = text
+                field.clear()
+                field.append(text)
+            if name in provisional:
+                field.setStyleSheet("font-style: italic;")
+                field.setToolTip("Předběžná hodnota, zpřesňuje se…")
+                self.provisional_outputs.add(name)
+            elif name in self.pending_outputs or name in self.provisional_outputs:
+                field.setStyleSheet("")
+                field.setToolTip("")
+                self.provisional_outputs.discard(name)
+        self.pending_outputs.difference_update(outputs) # (preliminary results bring only the outputs waiting for lambdas)
+        if not self.pending_outputs:
+            self.computing_timer.stop()
+    
+    def show_diagnostics(self, generation, calls, duration):
+        """ Breakdown of the recalculation in the status bar (summary) and its tooltip (every lambda lookup). """
+        milliseconds = lambda seconds: ac.prepare_float(seconds * 1000, 2)
+        
+        def describe(call):
+            prob, agg, *lu_max = call.key[1:-2] # key: (kind, prob, agg[, lu_max], method, decimals)
+            arguments = f"p = {ac.prepare_float(prob, 4)}, agg = {ac.prepare_float(agg, 1)}"
+            if lu_max:
+                arguments += f", LU_max = {ac.prepare_float(lu_max[0], 4)}"
+            return f"λ {call.kind} ({arguments}, {call.key[-1]} des. míst)"
+        
+        solved = [call for call in calls if call.solved]
+        message = f"Přepočet {milliseconds(duration)} ms: řešeno λ {len(solved)} " \
+                  f"({sum(call.evaluations for call in solved)} vyhodnocení cdf, {milliseconds(sum(call.duration for call in solved))} ms), " \
+                  f"z mezipaměti {len(calls) - len(solved)}"
+        if solved:
+            slowest = max(solved, key=lambda call: call.duration)
+            message += f"; nejdelší {describe(slowest)} {milliseconds(slowest.duration)} ms"
+        details = [f"{describe(call)}: {ac.prepare_float(call.x_lambda, 6)}, "
+                   + (f"{call.evaluations} vyhodnocení cdf ({call.cdf_calls} volání), " if call.solved else "z mezipaměti, ")
+                   + f"{milliseconds(call.duration)} ms" for call in calls]
+        self.statusBar().showMessage(message)
+        self.statusBar().setToolTip("\n".join(details))
+    
+    def seek_max_aggregation(self):
+        """ Starts the search of the largest aggregation meeting the required SDR for the current inputs (without and with UF). """
+        self.ui.goal_seek.setEnabled(False) # till the results are shown
+        self.worker.seek_max_aggregation(self.input_values, max_agg=self.ui.agg.maximum())
+    
+    def show_max_aggregation(self, inputs, results):
+        """ Shows the largest aggregations found by the worker and sets the chosen one as the aggregation
+        (searched again when the inputs were changed meanwhile). """
+        if dict(inputs, agg=self.input_values["agg"]) != self.input_values: # (the aggregation itself is not an input of the search)
+            self.worker.seek_max_aggregation(self.input_values, max_agg=self.ui.agg.maximum())
+            return
+        self.ui.goal_seek.setEnabled(True)
+        
+        labels = {"noUF": "bez UF", "UF": "s UF"}
+        lines = []
+        for variant, result in results.items():
+            if isinstance(result, ag.CalculationError):
+                lines.append(f"{labels[variant]}: nelze spočítat pro zadané vstupy")
+                continue
+            if result.agg is None:
+                lines.append(f"{labels[variant]}: ani agregace 1 nedosahuje požadovaného SDR")
+                continue
+            agg_text = ac.prepare_int(result.agg)
+            if result.agg == self.ui.agg.maximum():
+                agg_text = f"≥ {agg_text} (maximum vstupu)"
+            lines.append(f"{labels[variant]}: agregace (počet NTP) {agg_text}, SDR {ac.prepare_float(result.RSA, 1)} Mbit/s")
+        box = QMessageBox(QMessageBox.Icon.Information, "Maximální agregace",
+                          f"Největší agregace, při které SDR dosahuje požadovaných {ac.prepare_float(inputs['rsa_req'], 1)} Mbit/s:\n\n"
+                          + "\n".join(lines), parent=self)
+        use_buttons = {box.addButton(f"Použít {labels[variant]}", QMessageBox.ButtonRole.AcceptRole): result.agg
+                       for variant, result in results.items() if not isinstance(result, ag.CalculationError) and result.agg is not None}
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        if box.clickedButton() in use_buttons:
+            self.ui.agg.setValue(use_buttons[box.clickedButton()]) # recalculated as any other change
+    
+    def closeEvent(self, event):
+        self.worker.wait() # running calculation is not interrupted
+        super().closeEvent(event)
         
-        # handling of average NTP (Net Termination Points) without Utilization Factor
-        self.ui.out_ntp_noUF.append( ac.prepare_NTP_noUF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                         prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value()) )
-        self.ui.capacity.valueChanged.connect(self.update_NTP_noUF)
-        self.ui.mtu.valueChanged.connect(self.update_NTP_noUF)
-        self.ui.ipheader.currentTextChanged.connect(self.update_NTP_noUF)
-        self.ui.probability.currentTextChanged.connect(self.update_NTP_noUF)
-        self.ui.sdr_req.valueChanged.connect(self.update_NTP_noUF)
-        
-        # handling of average NTP (Net Termination Points) with Utilization Factor
-        self.ui.out_ntp_UF.append( ac.prepare_NTP_UF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                     nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(), 
-                                                     prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value()) )
-        self.ui.capacity.valueChanged.connect(self.update_NTP_UF)
-        self.ui.mtu.valueChanged.connect(self.update_NTP_UF)
-        self.ui.ipheader.currentTextChanged.connect(self.update_NTP_UF)
-        self.ui.probability.currentTextChanged.connect(self.update_NTP_UF)
-        self.ui.sdr_req.valueChanged.connect(self.update_NTP_UF)
-        self.ui.nbr_max.valueChanged.connect(self.update_NTP_UF)
-        self.ui.nbr_avg.valueChanged.connect(self.update_NTP_UF)
-        
-        # handling of decrease of service performance without Utilization Factor
-        self.ui.out_perf_noUF.append( ac.prepare_perf_decrease_noUF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                                    prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value()) )
-        self.ui.capacity.valueChanged.connect(self.update_perf_decrease_noUF)
-        self.ui.mtu.valueChanged.connect(self.update_perf_decrease_noUF)
-        self.ui.ipheader.currentTextChanged.connect(self.update_perf_decrease_noUF)
-        self.ui.probability.currentTextChanged.connect(self.update_perf_decrease_noUF)
-        self.ui.sdr_req.valueChanged.connect(self.update_perf_decrease_noUF)
-
-        # handling of decrease of service performance without Utilization Factor
-        self.ui.out_perf_UF.append( ac.prepare_perf_decrease_UF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                                nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(), 
-                                                                prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value()) )
-        self.ui.capacity.valueChanged.connect(self.update_perf_decrease_UF)
-        self.ui.mtu.valueChanged.connect(self.update_perf_decrease_UF)
-        self.ui.ipheader.currentTextChanged.connect(self.update_perf_decrease_UF)
-        self.ui.probability.currentTextChanged.connect(self.update_perf_decrease_UF)
-        self.ui.sdr_req.valueChanged.connect(self.update_perf_decrease_UF)
-        self.ui.nbr_max.valueChanged.connect(self.update_perf_decrease_UF)
-        self.ui.nbr_avg.valueChanged.connect(self.update_perf_decrease_UF)
-        
-        # handling of bandwidth needed
-        self.ui.out_bandwidth_min.append( ac.prepare_BW_min(mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), agg=self.ui.agg.value(), 
-                                                            prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value()) )
-        self.ui.mtu.valueChanged.connect(self.update_BW_min)
-        self.ui.ipheader.currentTextChanged.connect(self.update_BW_min)
-        self.ui.agg.valueChanged.connect(self.update_BW_min)
-        self.ui.probability.currentTextChanged.connect(self.update_BW_min)
-        self.ui.sdr_req.valueChanged.connect(self.update_BW_min)
-        
-        # handling of capacity needed
-        self.ui.out_capacity_min.append( ac.prepare_capacity_min(mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), agg=self.ui.agg.value(), 
-                                                                 nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(), 
-                                                                 prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value()) )
-        self.ui.mtu.valueChanged.connect(self.update_capacity_min)
-        self.ui.ipheader.currentTextChanged.connect(self.update_capacity_min)
-        self.ui.agg.valueChanged.connect(self.update_capacity_min)
-        self.ui.nbr_max.valueChanged.connect(self.update_capacity_min)
-        self.ui.nbr_avg.valueChanged.connect(self.update_capacity_min)
-        self.ui.probability.currentTextChanged.connect(self.update_capacity_min)
-        self.ui.sdr_req.valueChanged.connect(self.update_capacity_min)
-        
-        
-    def check_values_relations_capacity(self):
-        """ Check logical conditions that capacity >= NBR_max >= NBR_avg. """
+    def check_values_relations(self):
+        """ Check logical conditions that capacity >= NBR_max >= NBR_avg, all violated relations are shown in one message. """
         capacity = self.ui.capacity.value()
         nbr_max = self.ui.nbr_max.value()
         nbr_avg = self.ui.nbr_avg.value()
         
+        messages = []
         if capacity < nbr_max:
-            QMessageBox.critical(self, "Nesmyslné hodnoty!", 
-                                 """ <html><head/><body><p>
-                                 Kapacita (A.1) je menší než 
-                                 maximální bitová rychlost NBR<span style=\" vertical-align:sub;\">max</span> (B.1) 
-                                 </p></body></html> """)
-            #self.ui.nbr_max.setProperty("value", capacity) # set other "linked" values
+            messages.append(""" Kapacita (A.1) je menší než 
+                            maximální bitová rychlost NBR<span style=\" vertical-align:sub;\">max</span> (B.1) """)
         if capacity < nbr_avg:
-            QMessageBox.critical(self, "Nesmyslné hodnoty!", 
-                                 """ <html><head/><body><p>
-                                 Kapacita (A.1) je menší než 
-                                 průměrná bitová rychlost NBR<span style=\" vertical-align:sub;\">avg</span> (B.2) 
-                                 </p></body></html> """)
-    
-    def check_values_relations_nbr(self):
-        """ Check logical conditions that NBR_max >= NBR_avg. """
-        nbr_max = self.ui.nbr_max.value()
-        nbr_avg = self.ui.nbr_avg.value()
-        
+            messages.append(""" Kapacita (A.1) je menší než 
+                            průměrná bitová rychlost NBR<span style=\" vertical-align:sub;\">avg</span> (B.2) """)
         if nbr_avg > nbr_max:
+            messages.append(""" Maximální bitová rychlost NBR<span style=\" vertical-align:sub;\">max</span> (B.1) 
+                            je <br/>menší než průměrná bitová rychlost NBR<span style=\" vertical-align:sub;\">avg</span> (B.2) """)
+        
+        if messages:
             QMessageBox.critical(self, "Nesmyslné hodnoty!", 
-                                 """ <html><head/><body><p>
-                                 Maximální bitová rychlost NBR<span style=\" vertical-align:sub;\">max</span> (B.1) 
-                                 je <br/>menší než průměrná bitová rychlost NBR<span style=\" vertical-align:sub;\">avg</span> (B.2) 
-                                 </p></body></html> """)
+                                 """ <html><head/><body><p> """ + " </p><p> ".join(messages) + """ </p></body></html> """)
     
     def extract_ipheader_value(self):
         """ Extract number value from ComboBox text item. """
@@ -247,132 +337,25 @@ class CalculatorMainWindow(QMainWindow):
         item_val = int(item_text.split(sep=" ")[0])
         
         return item_val
-    
-    def update_LU_max(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        # TODO: check if capacity > nbr_max
-        output_val = ac.prepare_LU_max(capacity_L1=self.ui.capacity.value(), nbr_max=self.ui.nbr_max.value())
-        
-        self.ui.out_lu_max.clear()
-        self.ui.out_lu_max.append(output_val)
-    
-    def update_LU_avg(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        # TODO: check if capacity > nbr_max
-        output_val = ac.prepare_LU_avg(capacity_L1=self.ui.capacity.value(), nbr_avg=self.ui.nbr_avg.value())
-        
-        self.ui.out_lu_avg.clear()
-        self.ui.out_lu_avg.append(output_val)
-        
-    def update_UF(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        # TODO: check if nbr_avg < nbr_max and capacity > nbr_max
-        output_val = ac.prepare_UF(nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value())
-        
-        self.ui.out_uf.clear()
-        self.ui.out_uf.append(output_val)
-    
-    def update_RSA_noUF(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        output_val = ac.prepare_RSA_noUF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                         agg=self.ui.agg.value(), prob=(self.extract_probability_value()/100) )
-        
-        self.ui.out_sdr_noUF.clear()
-        self.ui.out_sdr_noUF.append(output_val)
-        
-    def update_RSA_UF(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        output_val = ac.prepare_RSA_UF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                       agg=self.ui.agg.value(), nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(),
-                                       prob=(self.extract_probability_value()/100) )
-        
-        self.ui.out_sdr_UF.clear()
-        self.ui.out_sdr_UF.append(output_val)
-        
-    # def update_BW_noUF(self):
-    #     """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-    #     output_val = ac.prepare_BW_noUF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-    #                                     agg=self.ui.agg.value(), prob=(self.extract_probability_value()/100) )
-    #    
-    #     self.ui.out_bandwidth_noUF.clear()
-    #     self.ui.out_bandwidth_noUF.append(output_val)
-        
-    # def update_BW_UF(self):
-    #     """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-    #     output_val = ac.prepare_BW_UF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-    #                                   nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(),
-    #                                   agg=self.ui.agg.value(), prob=(self.extract_probability_value()/100) )
-    #    
-    #     self.ui.out_bandwidth_UF.clear()
-    #     self.ui.out_bandwidth_UF.append(output_val)
-        
-    # def update_RSA_agg(self):
-    #     """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-    #     output_val = ac.prepare_RSA_agg(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-    #                                    agg=self.ui.agg.value() )
-    #    
-    #     self.ui.out_sdr_agg.clear()
-    #     self.ui.out_sdr_agg.append(output_val)
-        
-    def update_NTP_noUF(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        output_val = ac.prepare_NTP_noUF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                         prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value())
-        
-        self.ui.out_ntp_noUF.clear()
-        self.ui.out_ntp_noUF.append(output_val)
-        
-    def update_NTP_UF(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        output_val = ac.prepare_NTP_UF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                       nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(), 
-                                       prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value())
-        
-        self.ui.out_ntp_UF.clear()
-        self.ui.out_ntp_UF.append(output_val)
-        
-    def update_perf_decrease_noUF(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        output_val = ac.prepare_perf_decrease_noUF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                   prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value())
-        
-        self.ui.out_perf_noUF.clear()
-        self.ui.out_perf_noUF.append(output_val)
-        
-    def update_perf_decrease_UF(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        output_val = ac.prepare_perf_decrease_UF(capacity_L1=self.ui.capacity.value(), mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), 
-                                                 nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(), 
-                                                 prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value())
-        
-        self.ui.out_perf_UF.clear()
-        self.ui.out_perf_UF.append(output_val)
-        
-    def update_BW_min(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        output_val = ac.prepare_BW_min(mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), agg=self.ui.agg.value(), 
-                                       prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value())
-        
-        self.ui.out_bandwidth_min.clear()
-        self.ui.out_bandwidth_min.append(output_val)
-        
-    def update_capacity_min(self):
-        """ Get last input values from GUI fields, re/calculates result and updates it in the output field. """
-        output_val = ac.prepare_capacity_min(mtu=self.ui.mtu.value(), ipheader=self.extract_ipheader_value(), agg=self.ui.agg.value(), 
-                                             nbr_max=self.ui.nbr_max.value(), nbr_avg=self.ui.nbr_avg.value(), 
-                                             prob=(self.extract_probability_value()/100), rsa_req=self.ui.sdr_req.value())
-        
-        self.ui.out_capacity_min.clear()
-        self.ui.out_capacity_min.append(output_val)
 
 
 if __name__ == '__main__':
+    # persistent cache of results between runs of the app (turned off by environment variable NETCALC_PERSISTENT_CACHE=0)
+    if os.environ.get("NETCALC_PERSISTENT_CACHE", "1") != "0":
+        try:
+            ac.enable_persistent_cache()
+        except (OSError, sqlite3.Error):
+            pass # app works without the cache
+    app_trace.mark("persistent_cache_opened")
+    
     # One (and only one) QApplication instance per application.
     app = QApplication([])
+    app_trace.mark("qapplication_created")
     
     # Qt widget which is the application window
     window = CalculatorMainWindow()
     window.show()  # widgets without a parent are invisible by default
+    app_trace.mark("window_shown")
     
     # Start the event loop.
     app.exec()
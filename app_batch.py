@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized (batch) variants of the calculations from app_calc.
+
+All functions take NumPy arrays (or anything broadcastable to a common shape, e.g. scalars mixed with columns)
+instead of scalars and return result arrays. The formulas are shared with app_calc (its FORMULAS graph),
+only the lambda searching is done for all rows at once and every distinct (prob, agg) combination is solved only once.
+"""
+
+import time
+
+import numpy as np
+from scipy import special
+
+import app_calc as ac
+
+
+def _as_columns(*values):
+    """ Broadcasts all input values to arrays of the same shape. """
+    return np.broadcast_arrays(*[np.asarray(val, dtype=float) for val in values])
+
+def _solve_unique(kind, solver, *columns, method=None, decimals=None, executor=None):
+    """ Calls the vectorized solver only for distinct combinations of its input columns, which are neither in the precomputed
+    lambda tables nor in app_calc.lambda_cache (shared with scalar functions, same keys), and spreads the results back.
+    With executor (e.g. concurrent.futures.ProcessPoolExecutor) the distinct missing combinations are solved in chunks in parallel. """
+    method = method or ac.LAMBDA_SEARCH_METHOD
+    decimals = ac.LAMBDA_DECIMALS if decimals is None else decimals
+    columns = _as_columns(*columns)
+    shape = columns[0].shape
+    keys = np.stack([col.ravel() for col in columns], axis=1)
+    if keys.shape[0] == 0:
+        return np.zeros(shape)
+
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    unique_lambdas = np.full(unique_keys.shape[0], np.nan) # missing values are nan
+    tables = ac.lambda_tables() if method == "bracket" else None
+    if tables is not None:
+        unique_lambdas = _floor_lambda(tables.lookup_many(kind, unique_keys[:, 0], unique_keys[:, 1]), decimals)
+
+    cache_keys = [(kind, *row, method, decimals) for row in unique_keys.tolist()]
+    for i in np.flatnonzero(np.isnan(unique_lambdas)):
+        cached = ac.lambda_cache.get(cache_keys[i])
+        if cached is not None:
+            unique_lambdas[i] = cached
+
+    missing = np.flatnonzero(np.isnan(unique_lambdas))
+    if missing.size:
+        start = time.perf_counter()
+        if executor is None:
+            unique_lambdas[missing] = solver(*unique_keys[missing].T, method, decimals)
+        else:
+            unique_lambdas[missing] = _solve_parallel(executor, solver, unique_keys[missing], method, decimals)
+        solve_time = (time.perf_counter() - start) / missing.size
+        for i in missing:
+            ac.lambda_cache.put(cache_keys[i], float(unique_lambdas[i]), solve_time=solve_time)
+
+    return unique_lambdas[inverse.ravel()].reshape(shape)
+
+
+def _poisson_cdf(k, mu):
+    """ Vectorized app_calc._poisson_cdf (exact cdf, 0 for negative k). """
+    k = np.floor(np.asarray(k, dtype=float))
+
+    return np.where(k < 0, 0.0, special.pdtr(np.maximum(k, 0), mu))
+
+
+# number of distinct lambdas in one task sent to the executor (big enough for efficient vectorization and low pickling overhead)
+POOL_CHUNK_SIZE = 2048
+
+def _solve_chunk(solver, keys, method, decimals):
+    """ Task of the executor: solves the chunk of keys. """
+    return solver(*keys.T, method, decimals)
+
+def _solve_parallel(executor, solver, keys, method, decimals):
+    """ Solves the keys in chunks by the executor, results are in the order of the keys. """
+    chunks = [keys[start:start + POOL_CHUNK_SIZE] for start in range(0, keys.shape[0], POOL_CHUNK_SIZE)]
+    results = executor.map(_solve_chunk, [solver] * len(chunks), chunks, [method] * len(chunks), [decimals] * len(chunks))
+
+    return np.concatenate(list(results))
+
+def _floor_lambda(x_lambda, decimals):
+    """ Vectorized app_calc._floor_lambda (nan stays nan). """
+    if decimals >= ac.LAMBDA_DECIMALS:
+        return x_lambda
+
+    return np.floor(np.round(x_lambda * 10**ac.LAMBDA_DECIMALS) / 10**(ac.LAMBDA_DECIMALS - decimals)) / 10**decimals
+
+def _search_lambda_stepping(prob, agg, lu_max, k_of_lambda, round_decimals=6, decimals=6):
+    """ Coarse-to-fine search of lambda done for all rows at once, same semantics as the scalar stepping search in app_calc.
+    Row stops moving in the current step order as soon as its condition is not fulfilled anymore. """
+    precision = 1 / (10**decimals)
+    prob_rounded = np.round(prob, round_decimals)
+    x_lambda = np.zeros(prob.shape)
+
+    step = 100
+    while (step >= precision):
+        active = np.arange(prob.shape[0])
+        while active.size:
+            candidate = x_lambda[active] + step
+            k = np.floor(k_of_lambda(agg[active], lu_max[active], candidate))
+            cdf = np.where(k < 0, 0.0, special.pdtr(np.maximum(k, 0), candidate)) # = poisson.cdf (app_calc._poisson_cdf_exact)
+            moving = np.round(cdf, round_decimals) > prob_rounded[active]
+            x_lambda[active[moving]] = candidate[moving]
+            active = active[moving]
+        step /= 10
+
+    return x_lambda
+
+def _search_lambda_bisection(prob, agg, lu_max, k_of_lambda, round_decimals=6, decimals=6):
+    """ Bisection on the integer grid of precision done for all rows at once. Finds the same point as the bracket
+    search in app_calc (biggest lambda on the grid still fulfilling the condition), fixed number of vectorized steps. """
+    scale = 10**decimals
+    prob_rounded = np.round(prob, round_decimals)
+
+    def holds(n, rows):
+        x_lambda = n / scale
+        cdf = _poisson_cdf(k_of_lambda(agg[rows], lu_max[rows], x_lambda), x_lambda)
+        return np.round(cdf, round_decimals) > prob_rounded[rows]
+
+    # bracketing: condition holds in "low" (lambda 0 holds, cdf = 1), upper bound is doubled till it does not hold
+    low = np.zeros(prob.shape, dtype=np.int64)
+    high = np.full(prob.shape, 100 * scale, dtype=np.int64)
+    rows = np.arange(prob.shape[0])
+    while rows.size:
+        moving = rows[holds(high[rows], rows)]
+        low[moving] = high[moving]
+        high[moving] *= 2
+        rows = moving
+
+    rows = np.flatnonzero(high - low > 1)
+    while rows.size:
+        middle = (low[rows] + high[rows]) // 2
+        fulfilled = holds(middle, rows)
+        low[rows[fulfilled]] = middle[fulfilled]
+        high[rows[~fulfilled]] = middle[~fulfilled]
+        rows = rows[high[rows] - low[rows] > 1]
+
+    return low / scale
+
+def _search_lambda(prob, agg, lu_max, k_of_lambda, method=None, decimals=None):
+    """ Vectorized counterpart of app_calc._search_lambda (method is app_calc.LAMBDA_SEARCH_METHOD by default). """
+    method = method or ac.LAMBDA_SEARCH_METHOD
+    decimals = ac.LAMBDA_DECIMALS if decimals is None else decimals
+    if method == "bracket":
+        return _search_lambda_bisection(prob, agg, lu_max, k_of_lambda, decimals=decimals)
+    if method in ("stepping", "decade"): # rows are vectorized already, both give the results of the scalar stepping
+        return _search_lambda_stepping(prob, agg, lu_max, k_of_lambda, decimals=decimals)
+
+    raise ValueError(f"Unknown lambda search method: {method}")
+
+def _lambda_div_unique(prob, agg, method=None, decimals=None):
+    return _search_lambda(prob, agg, np.ones(prob.shape), lambda agg, lu_max, lam: agg/lam, method, decimals)
+
+def _lambda_RSA_UF_unique(prob, agg, lu_max, method=None, decimals=None):
+    return _search_lambda(prob, agg, lu_max, lambda agg, lu_max, lam: lu_max * (agg/lam), method, decimals)
+
+def _invert_lambda_simple(prob, agg, round_decimals=6, decimals=6):
+    """ Vectorized app_calc._invert_lambda_simple: inverse of Poisson cdf in its mean snapped to the grid of precision. """
+    scale = 10**decimals
+    prob_rounded = np.round(prob, round_decimals)
+    target = prob_rounded + 0.5 / 10**round_decimals
+
+    def holds(n, rows):
+        cdf = _poisson_cdf(agg[rows], n / scale)
+        return np.round(cdf, round_decimals) > prob_rounded[rows]
+
+    valid = (target < 1) & (agg >= 0) & np.isfinite(agg) # (estimated aggregations of degenerate rows can be inf or nan)
+    n = np.zeros(prob.shape, dtype=np.int64)
+    n[valid] = np.floor(special.gammainccinv(np.floor(agg[valid]) + 1, target[valid]) * scale)
+
+    # correction of the last digit (rounding of the inverse function)
+    rows = np.flatnonzero(n > 0)
+    while rows.size:
+        rows = rows[~holds(n[rows], rows)]
+        n[rows] -= 1
+        rows = rows[n[rows] > 0]
+    rows = np.flatnonzero(np.isfinite(agg))
+    while rows.size:
+        rows = rows[holds(n[rows] + 1, rows)]
+        n[rows] += 1
+
+    return np.where(np.isfinite(agg), n / scale, np.nan)
+
+def _lambda_simple_unique(prob, agg, method=None, decimals=None):
+    if (method or ac.LAMBDA_SEARCH_METHOD) == "bracket":
+        return _invert_lambda_simple(prob, agg, decimals=ac.LAMBDA_DECIMALS if decimals is None else decimals)
+
+    return _search_lambda(prob, agg, np.ones(prob.shape), lambda agg, lu_max, lam: agg, method, decimals)
+
+
+def calculate_lambda_div(prob, agg, method=None, decimals=None, executor=None):
+    """ Vectorized app_calc.calculate_lambda_div. """
+    return _solve_unique("div", _lambda_div_unique, prob, agg, method=method, decimals=decimals, executor=executor)
+
+def calculate_lambda_RSA_UF(prob, agg, lu_max, method=None, decimals=None, executor=None):
+    """ Vectorized app_calc.calculate_lambda_RSA_UF. """
+    return _solve_unique("RSA_UF", _lambda_RSA_UF_unique, prob, agg, lu_max, method=method, decimals=decimals, executor=executor)
+
+def calculate_lambda_simple(prob, agg, method=None, decimals=None, executor=None):
+    """ Vectorized app_calc.calculate_lambda_simple. """
+    return _solve_unique("simple", _lambda_simple_unique, prob, agg, method=method, decimals=decimals, executor=executor)
+
+
+def aggregation_estimated(capacity_L4, rsa_req):
+    """ Vectorized app_calc.aggregation_estimated (integer part of the ratio), inf or nan where it does not exist. """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.trunc(np.asarray(capacity_L4) / rsa_req)
+
+def ntp_estimated(capacity_L4, nbr_avg_L4, uf, rsa_req):
+    """ Vectorized app_calc.ntp_estimated (integer part of the ratio), inf or nan where it does not exist (e.g. zero
+    NBR at L4 of MTU 60 B with IPv6). """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.trunc( (uf * np.asarray(capacity_L4)**2)/(rsa_req * nbr_avg_L4) )
+
+
+# vectorized counterparts of the functions of app_calc.FORMULAS (the other functions work with arrays as they are)
+VECTORIZED = {
+    ac.aggregation_estimated: aggregation_estimated,
+    ac.ntp_estimated: ntp_estimated,
+    ac.calculate_lambda_div: calculate_lambda_div,
+    ac.calculate_lambda_RSA_UF: calculate_lambda_RSA_UF,
+    ac.calculate_lambda_simple: calculate_lambda_simple,
+}
+
+def _required(names):
+    """ Names of app_calc.FORMULAS needed for the given values (incl. themselves), in the order of evaluation. """
+    required = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in ac.FORMULAS and name not in required:
+            required.add(name)
+            pending.extend(ac.FORMULAS[name][1])
+
+    return [name for name in ac.FORMULAS if name in required]
+
+def _solve_lambdas(function, names, values, decimals=None, executor=None):
+    """ Lambdas of the same calculate_lambda_* function solved at once, so that they share the distinct combinations
+    of arguments (e.g. both estimated aggregations of calculate_lambda_simple). """
+    arguments = [[values[argument] for argument in ac.FORMULAS[name][1]] for name in names]
+    shape = arguments[0][0].shape
+    columns = [np.concatenate([column.ravel() for column in same_argument]) for same_argument in zip(*arguments)]
+    lambdas = VECTORIZED[function](*columns, decimals=decimals, executor=executor)
+    for index, name in enumerate(names):
+        values[name] = lambdas[index * lambdas.size // len(names):(index + 1) * lambdas.size // len(names)].reshape(shape)
+
+def _evaluate(inputs, names, decimals=None, executor=None):
+    """ Values of app_calc.FORMULAS given by names for the input columns (dict {input: values}), every needed
+    intermediate value (incl. lambdas) is calculated only once. Returns dict {name: result array}. """
+    values = dict(zip(inputs, _as_columns(*inputs.values())))
+    required = _required(names)
+    with np.errstate(divide="ignore", invalid="ignore"): # zero NBRs or L4 capacity of degenerate rows give inf or nan
+        for name in required:
+            if name in values:
+                continue # (solved together with another lambda)
+            function, arguments = ac.FORMULAS[name]
+            if name in ac.LAMBDAS:
+                ready = [other for other in required if other not in values and ac.FORMULAS[other][0] is function
+                         and all(argument in values for argument in ac.FORMULAS[other][1])]
+                _solve_lambdas(function, ready, values, decimals, executor)
+            else:
+                values[name] = VECTORIZED.get(function, function)(*(values[argument] for argument in arguments))
+
+    return {name: values[name] for name in names}
+
+def _calculate(name, **inputs):
+    """ Vectorized app_calc.calculate_<name> for the input columns. """
+    return _evaluate(inputs, (name,))[name]
+
+
+def calculate_RSA_noUF(capacity_L1, mtu, ipheader, agg, prob):
+    """ Vectorized app_calc.calculate_RSA_noUF. """
+    return _calculate("RSA_noUF", capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, agg=agg, prob=prob)
+
+def calculate_RSA_UF(capacity_L1, mtu, ipheader, agg, nbr_max, nbr_avg, prob):
+    """ Vectorized app_calc.calculate_RSA_UF. """
+    return _calculate("RSA_UF", capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, agg=agg, nbr_max=nbr_max, nbr_avg=nbr_avg,
+                      prob=prob)
+
+def calculate_NTP_noUF(capacity_L1, mtu, ipheader, prob, rsa_req):
+    """ Vectorized app_calc.calculate_NTP_noUF. """
+    return _calculate("NTP_noUF", capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, prob=prob, rsa_req=rsa_req)
+
+def calculate_NTP_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req):
+    """ Vectorized app_calc.calculate_NTP_UF. """
+    return _calculate("NTP_UF", capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, nbr_max=nbr_max, nbr_avg=nbr_avg, prob=prob,
+                      rsa_req=rsa_req)
+
+def calculate_perf_decrease_noUF(capacity_L1, mtu, ipheader, prob, rsa_req):
+    """ Vectorized app_calc.calculate_perf_decrease_noUF. """
+    return _calculate("perf_decrease_noUF", capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, prob=prob, rsa_req=rsa_req)
+
+def calculate_perf_decrease_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req):
+    """ Vectorized app_calc.calculate_perf_decrease_UF. """
+    return _calculate("perf_decrease_UF", capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, nbr_max=nbr_max, nbr_avg=nbr_avg,
+                      prob=prob, rsa_req=rsa_req)
+
+def calculate_BW_min(mtu, ipheader, agg, prob, rsa_req):
+    """ Vectorized app_calc.calculate_BW_min. """
+    return _calculate("BW_min", mtu=mtu, ipheader=ipheader, agg=agg, prob=prob, rsa_req=rsa_req)
+
+def calculate_capacity_min(mtu, ipheader, agg, nbr_max, nbr_avg, prob, rsa_req):
+    """ Vectorized app_calc.calculate_capacity_min. """
+    return _calculate("capacity_min", mtu=mtu, ipheader=ipheader, agg=agg, nbr_max=nbr_max, nbr_avg=nbr_avg, prob=prob,
+                      rsa_req=rsa_req)
+
+
+def pool_executor(workers=None):
+    """ Process pool for the executor argument (workers: number of processes, all CPUs by default). """
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def calculate_all(capacity_L1, mtu, ipheader, agg, nbr_max, nbr_avg, prob, rsa_req, decimals=None, executor=None, precision=None):
+    """ Calculates all outputs for the given input columns at once, every intermediate value (incl. lambdas) only once.
+    precision selects the precision tier of lambdas by name (app_calc.PRECISION_TIERS: "coarse" or "full"), decimals
+    the decimals of lambdas directly (full precision by default), executor (e.g. process pool of pool_executor())
+    solves the distinct missing lambdas in parallel. Returns dict {output name: result array} (rows in the input order). """
+    if precision is not None:
+        if precision not in ac.PRECISION_TIERS:
+            raise ValueError(f"unknown precision tier {precision!r}, one of: {', '.join(ac.PRECISION_TIERS)}")
+        decimals = ac.PRECISION_TIERS[precision]
+    inputs = dict(capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, agg=agg, nbr_max=nbr_max, nbr_avg=nbr_avg, prob=prob,
+                  rsa_req=rsa_req)
+
+    return _evaluate(inputs, ac.OUTPUTS, decimals, executor)
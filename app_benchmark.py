@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the public calculate_* functions of app_calc over a grid of the GUI input ranges.
+
+Every function is called once for each distinct combination of its arguments from the grid, with empty lambda cache
+(no persistent cache and no precomputed tables), so the latencies are those of solving, not of cache hits.
+The report shows per-call latency percentiles and numbers of poisson cdf evaluations of the lambda searches (counted
+by a second pass with the solver instrumentation, the timed calls run without it).
+Reports can be stored as baselines and later runs compared with them (timings depend on the machine, numbers of
+evaluations do not).
+
+  python app_benchmark.py                        (report)
+  python app_benchmark.py --save baseline        (report stored as benchmarks/baseline.json)
+  python app_benchmark.py --compare baseline     (report compared with the baseline, exit code 1 on regression)
+  python app_benchmark.py --method stepping --functions calculate_lambda_div calculate_BW_min
+"""
+
+import argparse
+import datetime
+import inspect
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+import app_calc as ac
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+FORMAT_VERSION = 1
+
+# GUI input ranges: capacity 0.1-1e6 Mbit/s, aggregation 1-99999, MTU 46-1514 B, IPv4/IPv6 header, probability 90/95 %,
+# required SDR 0.1-1e6 Mbit/s (0.1 gives estimated aggregations up to ~1e7); NBRs (net bitrates) follow the capacity:
+# lu_max = nbr_max/capacity_L1 (link utilization of the RSA_UF lambda), uf = nbr_avg/nbr_max
+GRID = {
+    "capacity_L1": (0.1, 1, 10, 100, 1000, 10000, 100000, 1000000),
+    "mtu": (46, 576, 1500, 1514),
+    "ipheader": (20, 40),
+    "agg": (1, 10, 100, 1000, 10000, 99999),
+    "prob": (0.9, 0.95),
+    "rsa_req": (0.1, 1, 10, 100),
+    "lu_max": (0.05, 0.5, 1.0),
+    "uf": (0.1, 0.5, 0.9),
+}
+# arguments of the functions taken from other values of the records than their names: calculate_lambda_simple is
+# used with the estimated aggregations (k of the NTP and performance decrease outputs, large for small SDR), not with agg
+ARGUMENT_VALUES = {"calculate_lambda_simple": (("prob", "agg_est"), ("prob", "ntp_est"))}
+
+PERCENTILES = (50, 90, 99)
+REGRESSION_TOLERANCE = 0.25 # relative increase of the median latency reported as regression
+REGRESSION_MIN_DIFFERENCE = 2.0 # [us] smaller differences of the median latency are noise
+
+
+def grid_records(grid=GRID):
+    """ All combinations of the grid values, with NBRs derived from the capacity (lu_max, uf) and the estimated
+    aggregations (agg_est, ntp_est). """
+    records = []
+    for values in itertools.product(*grid.values()):
+        record = dict(zip(grid, values))
+        record["nbr_max"] = record["capacity_L1"] * record["lu_max"]
+        record["nbr_avg"] = record["nbr_max"] * record["uf"]
+        scenario = ac.Scenario(**{name: record[name] for name in ac.INPUTS})
+        record["agg_est"], record["ntp_est"] = scenario.agg_est, scenario.ntp_est
+        records.append(record)
+
+    return records
+
+def public_functions():
+    """ {name: function} of the public calculate_* functions of app_calc. """
+    return {name: function for name, function in inspect.getmembers(ac, inspect.isfunction) if name.startswith("calculate_")}
+
+def _arguments(function):
+    """ Names of the required arguments (optional settings as method or decimals keep their defaults). """
+    return [name for name, parameter in inspect.signature(function).parameters.items() if parameter.default is parameter.empty]
+
+def _call(function, values):
+    """ Calls the function, False when it fails on the input values. """
+    try:
+        function(*values)
+    except (ArithmeticError, ValueError):
+        return False
+
+    return True
+
+def _percentiles(values):
+    values = sorted(values)
+    result = {f"p{percentile}": values[min(len(values) * percentile // 100, len(values) - 1)] for percentile in PERCENTILES}
+    result["max"] = values[-1]
+    result["mean"] = sum(values) / len(values)
+
+    return result
+
+
+def run(functions=None, grid=GRID, method=None):
+    """ Benchmarks the functions ({name: function}, all public ones by default), returns the report (dict).
+    Lambda cache is cleared before each call; the persistent cache and the tables should be off (see main()). """
+    functions = functions or public_functions()
+    records = grid_records(grid)
+    ac.import_numerics() # (done by the first calculation otherwise, it would be its latency)
+    original_method = ac.LAMBDA_SEARCH_METHOD
+    ac.LAMBDA_SEARCH_METHOD = method or original_method
+    results = {}
+    try:
+        for name, function in functions.items():
+            calls = sorted({tuple(record[argument] for argument in arguments)
+                            for arguments in ARGUMENT_VALUES.get(name, (_arguments(function),)) for record in records})
+            latencies, evaluations, errors = [], [], 0
+            for values in calls: # timed without the solver instrumentation
+                ac.lambda_cache.clear()
+                start = time.perf_counter()
+                errors += not _call(function, values) # (e.g. zero lambda of a degenerated input, timed as well)
+                latencies.append((time.perf_counter() - start) * 1e6)
+            with ac.solver_trace() as solver_calls: # separate pass counting the cdf evaluations of the lambda lookups
+                for values in calls:
+                    ac.lambda_cache.clear()
+                    solver_calls.clear()
+                    _call(function, values)
+                    evaluations.append(sum(call.evaluations for call in solver_calls))
+            results[name] = {"calls": len(calls), "errors": errors, "latency_us": _percentiles(latencies),
+                             "evaluations": {"total": sum(evaluations), "mean": sum(evaluations) / len(evaluations),
+                                             "max": max(evaluations)}}
+    finally:
+        ac.LAMBDA_SEARCH_METHOD = original_method
+        ac.lambda_cache.clear()
+
+    return {
+        "format_version": FORMAT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "algorithm_version": ac.ALGORITHM_VERSION,
+        "method": ac.LAMBDA_SEARCH_METHOD if method is None else method,
+        "grid": {name: list(values) for name, values in grid.items()},
+        "functions": results,
+    }
+
+def compare(report, baseline, tolerance=REGRESSION_TOLERANCE):
+    """ Functions whose median latency grew over the tolerance or which need more cdf evaluations than in the baseline,
+    list of (function, description). A baseline of another grid (other calls) is not comparable. """
+    if report["grid"] != baseline.get("grid"):
+        return [("grid", "the baseline was measured on another grid of inputs, save a new baseline")]
+    regressions = []
+    for name, result in report["functions"].items():
+        old = baseline["functions"].get(name)
+        if old is None:
+            continue
+        median, old_median = result["latency_us"]["p50"], old["latency_us"]["p50"]
+        if median > old_median * (1 + tolerance) and median - old_median > REGRESSION_MIN_DIFFERENCE:
+            regressions.append((name, f"median latency {old_median:.1f} -> {median:.1f} us"))
+        if result["evaluations"]["total"] > old["evaluations"]["total"]:
+            regressions.append((name, f"cdf evaluations {old['evaluations']['total']} -> {result['evaluations']['total']}"))
+
+    return regressions
+
+def format_report(report, baseline=None):
+    """ Lines of the report table (with median latency of the baseline when given). """
+    header = f"{'function':>32} {'calls':>6} {'err':>4} " + " ".join(f"{f'p{p} us':>9}" for p in PERCENTILES) + \
+             f" {'max us':>9} {'cdf/call':>9} {'cdf max':>8}"
+    if baseline is not None:
+        header += f" {'base p50':>9} {'change':>7}"
+    lines = [f"method {report['method']}, "
+             f"{len(grid_records({name: tuple(values) for name, values in report['grid'].items()}))} grid points", header]
+    for name, result in report["functions"].items():
+        latency, evaluations = result["latency_us"], result["evaluations"]
+        line = f"{name:>32} {result['calls']:>6} {result['errors']:>4} " + \
+               " ".join(f"{latency[f'p{p}']:>9.1f}" for p in PERCENTILES) + \
+               f" {latency['max']:>9.1f} {evaluations['mean']:>9.1f} {evaluations['max']:>8}"
+        old = baseline["functions"].get(name) if baseline is not None else None
+        if old is not None:
+            line += f" {old['latency_us']['p50']:>9.1f} {latency['p50'] / old['latency_us']['p50'] - 1:>+7.0%}"
+        lines.append(line)
+
+    return lines
+
+
+def _baseline_path(name):
+    return name if name.endswith(".json") else os.path.join(BASELINE_DIR, f"{name}.json")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the calculate_* functions of app_calc over the grid of GUI input ranges.")
+    parser.add_argument("--functions", nargs="+", metavar="NAME", help="benchmarked functions (all public calculate_* by default)")
+    parser.add_argument("--method", choices=("bracket", "stepping", "decade"), help="lambda search method (app_calc default)")
+    parser.add_argument("--save", metavar="BASELINE", help="store the report as baseline (name in benchmarks/ or .json path)")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with the stored baseline, exit code 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help=f"relative increase of the median latency reported as regression (default {REGRESSION_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    functions = public_functions()
+    if args.functions:
+        unknown = set(args.functions) - set(functions)
+        if unknown:
+            parser.error(f"unknown functions: {', '.join(sorted(unknown))}")
+        functions = {name: functions[name] for name in args.functions}
+    baseline = None
+    if args.compare:
+        with open(_baseline_path(args.compare), encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    ac.disable_persistent_cache()
+    ac.load_lambda_tables(False) # solving, not reading of precomputed lambdas
+    report = run(functions, method=args.method)
+    print("\n".join(format_report(report, baseline)))
+
+    if args.save:
+        path = _baseline_path(args.save)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=1)
+        print(f"saved to {path}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        for name, description in regressions:
+            print(f"REGRESSION {name}: {description}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent (on-disk) cache of solved lambdas and calculation results surviving application restarts.
+
+Values are stored in SQLite database in the user's cache directory. Every entry is keyed on the algorithm version
+of app_calc and the full input tuple, so changes of the calculation code never return stale values, while installed
+versions of the application sharing the file keep their entries side by side. The number of entries is bounded,
+least recently used entries are evicted (including those of versions not used anymore).
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+APP_NAME = "NetCalculator"
+# inserts of this process between recounts of the entries as a fraction of the size cap (processes sharing the file
+# insert as well, e.g. CLI workers or server and GUI, so each of them can exceed the cap by this fraction at most)
+EVICTION_CHECK_FRACTION = 0.01
+
+
+def user_cache_dir():
+    """ Platform specific directory for cached data of the application. """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+
+    return os.path.join(base, APP_NAME)
+
+
+class PersistentCache:
+    """ SQLite key-value store of float results with size cap and LRU eviction. Safe to use from more threads. """
+
+    def __init__(self, path=None, version=0, max_entries=100000):
+        if path is None:
+            path = os.path.join(user_cache_dir(), "cache.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._size = 0 # entries counted by the last eviction check plus inserts of this process since then
+        self._inserts = 0 # inserts since the last eviction check
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value REAL NOT NULL, "
+                                     "version INTEGER NOT NULL, accessed REAL NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            self._evict()
+
+    def _key(self, key):
+        # version is a part of the key, numbers are normalized, so 256 and 256.0 are the same input
+        return repr((self.version, *(float(item) if isinstance(item, (int, float)) else item for item in key)))
+
+    def get(self, key):
+        """ Stored value for the key (tuple of inputs) or None. """
+        with self._lock:
+            if self._connection is None: # closed (e.g. disabled while other threads still calculate)
+                return None
+            row = self._connection.execute("SELECT value FROM entries WHERE key = ?", (self._key(key),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), self._key(key)))
+
+        return row[0]
+
+    def put(self, key, value):
+        """ Stores the value for the key (tuple of inputs). """
+        with self._lock:
+            if self._connection is None:
+                return
+            updated = self._connection.execute("UPDATE entries SET value = ?, accessed = ? WHERE key = ?",
+                                               (float(value), time.time(), self._key(key))).rowcount
+            if not updated:
+                self._connection.execute("INSERT INTO entries (key, value, version, accessed) VALUES (?, ?, ?, ?)",
+                                         (self._key(key), float(value), self.version, time.time()))
+                self._size += 1
+                self._inserts += 1
+                if self._size > self.max_entries or self._inserts >= max(self.max_entries * EVICTION_CHECK_FRACTION, 1):
+                    self._evict()
+
+    def _evict(self):
+        """ Deletes the least recently used entries over the size cap (called with the lock held). The entries are
+        counted in the same transaction as deleted, so entries of other processes sharing the file are included. """
+        self._inserts = 0
+        self._connection.execute("BEGIN IMMEDIATE") # (write lock of the file, no other process inserts till commit)
+        try:
+            self._size = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if self._size > self.max_entries:
+                self._connection.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                                         (self._size - self.max_entries,))
+                self._size = self.max_entries
+            self._connection.execute("COMMIT")
+        except sqlite3.Error:
+            self._connection.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        """ Deletes all entries. """
+        with self._lock:
+            if self._connection is None:
+                return
+            self._connection.execute("DELETE FROM entries")
+            self._size = 0
+
+    def info(self):
+        """ Counters and size of the cache. """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": self._size, "max_entries": self.max_entries, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
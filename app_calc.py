@@ -1,9 +1,39 @@
 # -*- coding: utf-8 -*-
 """
 Calculations and value preparations for presentation in GUI fields.
+
+Thread safety: the calculate_*, prepare_* and derive_* functions can be called from more threads at once (also in free-threaded
+CPython builds). They do not modify shared state except the caches, which are locked: lambda_cache (LambdaCache),
+persistent_cache (app_cache.PersistentCache) and the lazily opened read-only lambda tables. Two threads missing the same
+lambda at once may both solve it (with the same result). Settings (LAMBDA_SEARCH_METHOD, enable/disable_persistent_cache,
+load_lambda_tables) are meant to be changed before concurrent use, not during it.
 """
 
-from scipy.stats import poisson
+import collections
+import contextlib
+import dataclasses
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from statistics import NormalDist
+from typing import Optional
+
+# version of calculation algorithms, must be increased with every change of results (invalidates precomputed lambda tables)
+ALGORITHM_VERSION = 3
+
+# numpy and scipy.special (hundreds of ms) are imported by the first calculation needing them, not with this module,
+# so that the GUI window is shown before; scipy.stats (most of scipy) is not needed at all (see _poisson_cdf_exact)
+np = gammainccinv = pdtr = None
+
+def import_numerics():
+    """ Imports numpy and scipy.special functions used by the calculations (can be called ahead, e.g. in background thread). """
+    global np, gammainccinv, pdtr
+    import numpy as np
+    from scipy.special import gammainccinv, pdtr # pdtr last: "pdtr is None" tests that all of them are imported
 
 
 def prepare_float(raw_float, round_decimals):
@@ -23,6 +53,17 @@ def prepare_int(raw_num):
     
     return out_val
 
+# decimals of the outputs presented in GUI (0 = integer with thousand separator)
+DISPLAY_DECIMALS = {"LU_max": 2, "LU_avg": 2, "UF": 2, "RSA_noUF": 1, "RSA_UF": 1, "NTP_noUF": 0, "NTP_UF": 0,
+                    "perf_decrease_noUF": 1, "perf_decrease_UF": 1, "BW_min": 1, "capacity_min": 1}
+
+def prepare_output(name, raw_value):
+    """ Raw value of the output (name of DISPLAY_DECIMALS) for presentation in GUI. """
+    if DISPLAY_DECIMALS[name] == 0:
+        return prepare_int(raw_value)
+    
+    return prepare_float(raw_value, DISPLAY_DECIMALS[name])
+
 def calculate_LU_max(capacity_L1, nbr_max):
     """ Calculates Maximal Link Utilization in raw form. """
     return nbr_max / capacity_L1
@@ -30,7 +71,7 @@ def calculate_LU_max(capacity_L1, nbr_max):
 def prepare_LU_max(capacity_L1, nbr_max): 
     """ Max LU (Link Utilization) for presentation in GUI. """
     output_LU = calculate_LU_max(capacity_L1, nbr_max)
-    output_LU = prepare_float(output_LU, 2)
+    output_LU = prepare_output("LU_max", output_LU)
     
     return output_LU
 
@@ -42,7 +83,7 @@ def calculate_LU_avg(capacity_L1, nbr_avg):
 def prepare_LU_avg(capacity_L1, nbr_avg): 
     """ Avg LU (Link Utilization) for presentation in GUI. """
     output_LU = calculate_LU_avg(capacity_L1, nbr_avg)
-    output_LU = prepare_float(output_LU, 2)
+    output_LU = prepare_output("LU_avg", output_LU)
     
     return output_LU
 
@@ -53,8 +94,8 @@ def calculate_UF(nbr_max, nbr_avg):
 
 def prepare_UF(nbr_max, nbr_avg):
     """ Utilizaton factor for presentation in app GUI. """
-    output_UF = calculate_UF(nbr_max, nbr_avg)    
-    output_UF = prepare_float(output_UF, 2)
+    output_UF = calculate_UF(nbr_max, nbr_avg)
+    output_UF = prepare_output("UF", output_UF)
     
     return output_UF
 
@@ -76,16 +117,349 @@ def aggregation_estimated(capacity_L4, rsa_req):
     
     return agg_est
 
+def ntp_estimated(capacity_L4, nbr_avg_L4, uf, rsa_req):
+    """ Estimated number of NTP (Net Termination Points) with Utilization Factor for further use in other calculations. """
+    ntp_est = int( (uf * capacity_L4**2)/(rsa_req * nbr_avg_L4) )
+    
+    return ntp_est
 
-def calculate_lambda_div(prob, agg): 
-    """ Calculates expected value lambda (mean number of occurences) as num1/num vs. num for further use in other calculations.
-    Searching the lambda given probability of occurence and number of events. """
-    # The Poisson parameter Lambda (lam) is the total number of events (k) divided by the number of units (n) in the data (lam = k/n).
-    # https://stackoverflow.com/questions/69455797/better-way-to-calculate-%CE%BB-in-a-poisson-distribution-if-the-probability-of-occurr
-    # x_lam = -np.log(1-prob) # analytically only for prob=0 ???
+
+class LambdaCache:
+    """ Bounded memory of already solved lambdas shared by calculate_lambda_* functions (and app_batch),
+    least recently used values are evicted when the size bound is reached. maxsize=0 disables caching. """
+    
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.solve_time = 0.0 # total time spent by solving on misses [s]
+    
+    def get(self, key):
+        """ Cached value for the key or None, counts hit/miss. """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key, value, solve_time=0.0):
+        """ Stores the value, evicts the least recently used ones over the size bound (nothing is stored with maxsize=0). """
+        with self._lock:
+            self.solve_time += solve_time
+            if self.maxsize <= 0:
+                return
+            self._values[key] = value
+            self._values.move_to_end(key)
+            self._evict()
+    
+    def peek(self, key):
+        """ Cached value for the key or None, without counting and without refreshing its recent use. """
+        with self._lock:
+            return self._values.get(key)
+    
+    def lookup(self, key, solve):
+        """ Cached value for the key, calls solve() and stores its result when missing (None result is not stored). """
+        value = self.get(key)
+        if value is None:
+            start = time.perf_counter()
+            value = solve()
+            if value is not None:
+                self.put(key, value, solve_time=time.perf_counter() - start)
+        
+        return value
+    
+    def resize(self, maxsize):
+        """ Changes the size bound (evicts immediately when lowered). """
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+    
+    def clear(self):
+        """ Removes all values and resets the counters. """
+        with self._lock:
+            self._values.clear()
+            self.hits = self.misses = self.evictions = 0
+            self.solve_time = 0.0
+    
+    def info(self):
+        """ Counters of the cache, saved_time is estimated from average solving time of misses. """
+        with self._lock:
+            average_solve_time = self.solve_time / self.misses if self.misses else 0.0
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, 
+                    "size": len(self._values), "maxsize": self.maxsize,
+                    "solve_time": self.solve_time, "saved_time": self.hits * average_solve_time}
     
-    round_decimals = 6
-    precision = 1 / (10**round_decimals) # smallest step must be compatible with rounding precision
+    def _evict(self):
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+            self.evictions += 1
+
+lambda_cache = LambdaCache()
+
+
+# optional persistent cache (app_cache) of lambdas and results surviving application restarts
+persistent_cache = None
+
+def enable_persistent_cache(path=None, max_entries=100000):
+    """ Turns on the on-disk cache (SQLite file in user's cache directory by default), returns it. """
+    global persistent_cache
+    import app_cache
+    persistent_cache = app_cache.PersistentCache(path, version=ALGORITHM_VERSION, max_entries=max_entries)
+    
+    return persistent_cache
+
+def disable_persistent_cache():
+    """ Turns off the on-disk cache. """
+    global persistent_cache
+    if persistent_cache is not None:
+        persistent_cache.close()
+    persistent_cache = None
+
+_lookup_mode = threading.local() # cached_only() of the thread
+
+@contextlib.contextmanager
+def cached_only():
+    """ Context manager: calculate_lambda_* called by the current thread give only lambdas found in the tables or caches,
+    None instead of solving the missing ones (GUI shows the final results at once when nothing needs to be solved). """
+    previous = getattr(_lookup_mode, "cached_only", False)
+    _lookup_mode.cached_only = True
+    try:
+        yield
+    finally:
+        _lookup_mode.cached_only = previous
+
+def _cached_lambda(key, solve):
+    """ Lambda from the memory cache, from the persistent cache (when enabled) or solved by solve(bracket).
+    Lambdas of the bracket method in other precision tiers (keys differing in decimals, their last item) are shared:
+    a cached finer one floored is the lambda without solving, a cached coarser one and its next grid point bracket
+    the searching (bracket: (low, high) or None, see _search_lambda). None within cached_only() instead of solving. """
+    method, decimals = key[-2:]
+    other_tiers = sorted(set(PRECISION_TIERS.values()) - {decimals}, reverse=True) if method == "bracket" else []
+    
+    def solve_persistent():
+        bracket = None
+        for tier_decimals in other_tiers: # (finest first)
+            tier_lambda = lambda_cache.peek(key[:-1] + (tier_decimals,))
+            if tier_lambda is not None and tier_decimals > decimals:
+                return _floor_lambda(tier_lambda, decimals)
+            if tier_lambda is not None:
+                bracket = (tier_lambda, tier_lambda + 10**-tier_decimals)
+                break
+        
+        cache = persistent_cache
+        x_lambda = cache.get(key) if cache is not None else None
+        if x_lambda is not None or getattr(_lookup_mode, "cached_only", False):
+            return x_lambda
+        x_lambda = solve(bracket)
+        if cache is not None:
+            cache.put(key, x_lambda)
+        return x_lambda
+    
+    return lambda_cache.lookup(key, solve_persistent)
+
+def _persistent_result(function):
+    """ Decorator storing results of the calculation in the persistent cache when it is enabled. """
+    signature = inspect.signature(function)
+    
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        cache = persistent_cache
+        if cache is None:
+            return function(*args, **kwargs)
+        key = (function.__name__, LAMBDA_SEARCH_METHOD, *signature.bind(*args, **kwargs).arguments.values())
+        result = cache.get(key)
+        if result is None:
+            result = function(*args, **kwargs)
+            cache.put(key, result)
+        return result
+    
+    return wrapper
+
+
+# solver instrumentation (diagnostics of slow calculations): every lambda lookup of calculate_lambda_* (except those read
+# from the precomputed tables) is reported to the registered observers as a SolverCall. The instrumented functions are
+# swapped in only while some observer is registered, so there is no overhead at all otherwise.
+#   kind: "div", "RSA_UF" or "simple"; key: cache key (kind, prob, agg[, lu_max], method, decimals); x_lambda: result;
+#   solved: False when found in a cache; duration [s]; evaluations: poisson cdf values computed; cdf_calls: calls of cdf
+#   functions (smaller than evaluations for the vectorized decade steps of the "decade" method); thread: thread ident
+SolverCall = collections.namedtuple("SolverCall", "kind key x_lambda solved duration evaluations cdf_calls thread")
+
+_solver_observers = []
+_solver_observers_lock = threading.Lock()
+_solver_originals = {}
+_solver_counters = threading.local() # cdf counters of the solving running in the thread
+
+def add_solver_observer(callback):
+    """ Registers callback(SolverCall) called (in the calculating thread) after every lambda lookup. """
+    with _solver_observers_lock:
+        _solver_observers.append(callback)
+        if not _solver_originals:
+            _instrument_solvers()
+
+def remove_solver_observer(callback):
+    """ Unregisters the callback, the original (not instrumented) functions are restored after the last one. """
+    with _solver_observers_lock:
+        _solver_observers.remove(callback)
+        if not _solver_observers:
+            globals().update(_solver_originals)
+            _solver_originals.clear()
+
+@contextlib.contextmanager
+def solver_trace():
+    """ Context manager collecting SolverCalls of the lambda lookups done by the current thread into the yielded list. """
+    calls = []
+    thread = threading.get_ident()
+    observer = lambda call: calls.append(call) if call.thread == thread else None
+    add_solver_observer(observer)
+    try:
+        yield calls
+    finally:
+        remove_solver_observer(observer)
+
+def _instrument_solvers():
+    # called with the lock held
+    cached_lambda, poisson_cdf, poisson_cdf_exact = _cached_lambda, _poisson_cdf, _poisson_cdf_exact
+    _solver_originals.update(_cached_lambda=cached_lambda, _poisson_cdf=poisson_cdf, _poisson_cdf_exact=poisson_cdf_exact)
+    
+    def count(evaluations):
+        counters = _solver_counters
+        counters.evaluations = getattr(counters, "evaluations", 0) + evaluations
+        counters.cdf_calls = getattr(counters, "cdf_calls", 0) + 1
+    
+    def instrumented_poisson_cdf(k, mu):
+        count(1)
+        return poisson_cdf(k, mu)
+    
+    def instrumented_poisson_cdf_exact(k, mu):
+        count(len(k) if isinstance(k, (list, tuple)) or (np is not None and isinstance(k, np.ndarray)) else 1)
+        return poisson_cdf_exact(k, mu)
+    
+    def instrumented_cached_lambda(key, solve):
+        counters = _solver_counters
+        counters.evaluations = counters.cdf_calls = 0
+        solved = False
+        
+        def counted_solve(bracket):
+            nonlocal solved
+            solved = True
+            return solve(bracket)
+        
+        start = time.perf_counter()
+        x_lambda = cached_lambda(key, counted_solve)
+        duration = time.perf_counter() - start
+        if x_lambda is None:
+            return None # not solved within cached_only()
+        call = SolverCall(key[0], key, x_lambda, solved, duration, counters.evaluations, counters.cdf_calls, threading.get_ident())
+        for observer in list(_solver_observers):
+            observer(call)
+        
+        return x_lambda
+    
+    globals().update(_cached_lambda=instrumented_cached_lambda, _poisson_cdf=instrumented_poisson_cdf,
+                     _poisson_cdf_exact=instrumented_poisson_cdf_exact)
+
+
+# precomputed lambda tables (app_tables), opened lazily on first use
+_lambda_tables = None
+_lambda_tables_loaded = False
+_lambda_tables_lock = threading.Lock()
+
+def load_lambda_tables(path=None):
+    """ (Re)opens the precomputed lambda tables from the path (app_tables.DEFAULT_PATH by default), path=False disables them.
+    Returns True when the tables are available. """
+    with _lambda_tables_lock:
+        _load_lambda_tables(path)
+    
+    return _lambda_tables is not None
+
+def _load_lambda_tables(path):
+    # called with the lock held
+    global _lambda_tables, _lambda_tables_loaded
+    if path is False:
+        _lambda_tables = None
+    else:
+        import app_tables
+        _lambda_tables = app_tables.open_tables(path or app_tables.DEFAULT_PATH)
+    _lambda_tables_loaded = True
+
+def lambda_tables():
+    """ Precomputed lambda tables or None when not available (path can be set by NETCALC_LAMBDA_TABLES environment variable). """
+    if not _lambda_tables_loaded:
+        with _lambda_tables_lock:
+            if not _lambda_tables_loaded: # other thread could load them meanwhile
+                _load_lambda_tables(os.environ.get("NETCALC_LAMBDA_TABLES"))
+    
+    return _lambda_tables
+
+def _tabulated_lambda(kind, prob, agg, method):
+    """ Lambda from the precomputed tables or None (tables are generated by the default method only). """
+    if method != "bracket":
+        return None
+    tables = lambda_tables()
+    
+    return tables.lookup(kind, prob, agg) if tables is not None else None
+
+
+# method of searching the lambda in calculate_lambda_* functions:
+#  "bracket"  - bracketing of the crossing point and its narrowing (default, lowest number of poisson.cdf evaluations),
+#               calculate_lambda_simple inverts the cdf directly (constant time)
+#  "stepping" - original coarse-to-fine brute force, kept for reference
+#  "decade"   - the same coarse-to-fine steps with bit-identical results as "stepping", but all ten steps of each decade
+#               are evaluated in one vectorized poisson.cdf call (for reproducing of audited results with lower latency)
+LAMBDA_SEARCH_METHOD = "bracket"
+
+def _poisson_cdf(k, mu):
+    """ Poisson cdf for the default search: scipy.special.pdtr is the exact function behind poisson.cdf without its
+    overhead (same values, ~40x faster call). An asymptotic (normal) approximation would save only ~1 us per call
+    and could move the found lambda in the last digit, so the results of all methods stay the same. """
+    k = math.floor(k)
+    if k < 0:
+        return 0.0
+    if pdtr is None:
+        import_numerics()
+    
+    return pdtr(k, mu)
+
+def _poisson_cdf_exact(k, mu):
+    """ Poisson cdf with the same values as scipy.stats.poisson.cdf (pdtr of floored k, 0 for negative k) without
+    the import of scipy.stats. k and mu are numbers, or sequences evaluated in one vectorized call. """
+    if pdtr is None:
+        import_numerics()
+    if isinstance(k, (list, tuple, np.ndarray)):
+        k = np.floor(k)
+        return np.where(k < 0, 0.0, pdtr(np.maximum(k, 0), mu))
+    
+    return 0.0 if k < 0 else pdtr(np.floor(k), mu)
+
+# lambda is searched on the grid of LAMBDA_DECIMALS decimal places, the cdf is always compared rounded to 6 decimals;
+# calculate_lambda_* with smaller decimals (precision tiers) search a coarser grid with fewer cdf evaluations and give
+# the full precision lambda floored to these decimals (the condition is monotonic in lambda), used for preliminary results;
+# the coarse grid has one decimal more than the finest rounding of the outputs shown in GUI (DISPLAY_DECIMALS), which is
+# not enough for every output: they multiply lambda by factors like capacity_L4/agg, so the relative error of lambda
+# decides - outputs whose shown digits can differ within the grid step are marked provisional (app_graph
+# CalculationGraph.provisional_outputs); the full precision search then starts from the bracket of the coarse lambda
+# (see _cached_lambda)
+LAMBDA_DECIMALS = 6
+PRECISION_TIERS = {"coarse": max(DISPLAY_DECIMALS.values()) + 1, "full": LAMBDA_DECIMALS}
+
+def _floor_lambda(x_lambda, decimals):
+    """ Full precision lambda floored to the coarser grid, the same value as searched on that grid. """
+    if decimals >= LAMBDA_DECIMALS:
+        return x_lambda
+    
+    return (round(x_lambda * 10**LAMBDA_DECIMALS) // 10**(LAMBDA_DECIMALS - decimals)) / 10**decimals
+
+
+def _search_lambda_stepping(prob, k_of_lambda, round_decimals=6, decimals=6):
+    """ Searching the lambda by original "optimized" brute force, from big step to small step.
+    Returns the lambda and number of poisson.cdf evaluations. """
+    precision = 1 / (10**decimals) # smallest step must be compatible with rounding precision
+    evaluations = 0
     
     # "optimized" brute force: from "biggest" reasonable step to small step to have good final precision and low number of steps
     step = 100 # big enough step in the start of searching
@@ -94,17 +468,227 @@ def calculate_lambda_div(prob, agg):
     # fining the result till desired precision
     while (step >= precision):
         # searching with given precision
-        
-        while round(poisson.cdf(k=agg/(x_lambda + step), mu=(x_lambda + step)), round_decimals) > round(prob, round_decimals):
+        while True:
+            evaluations += 1
+            if not round(_poisson_cdf_exact(k_of_lambda(x_lambda + step), x_lambda + step), round_decimals) > round(prob, round_decimals):
+                break
             x_lambda += step
         step /= 10 # lowering the order of step and continue with better precision
     
-    return x_lambda
+    return x_lambda, evaluations
+
+def _search_lambda_decade(prob, k_of_lambda, round_decimals=6, decimals=6):
+    """ Searching the lambda with the coarse-to-fine decade semantics of the stepping search and bit-identical result.
+    The candidates x_lambda + step, + 2*step ... + 10*step are accumulated by the same float additions as in the stepping
+    and evaluated in one vectorized poisson.cdf call, the first one not fulfilling the condition ends the decade.
+    Big lambdas jump ahead to a multiple of the first step (exact in float, as its accumulation) below the analytic estimate.
+    Returns the lambda and number of poisson.cdf evaluations. """
+    precision = 1 / (10**decimals)
+    prob_rounded = round(prob, round_decimals)
+    evaluations = 0
+    
+    def holds(candidates):
+        nonlocal evaluations
+        evaluations += len(candidates)
+        cdf = _poisson_cdf_exact([k_of_lambda(candidate) for candidate in candidates], candidates)
+        return [round(value, round_decimals) > prob_rounded for value in cdf]
+    
+    step = 100 # big enough step in the start of searching
+    x_lambda = 0
+    
+    # jumping ahead (two steps below the estimate for safety)
+    jumps = int(_estimate_lambda(prob, k_of_lambda) // step) - 1
+    if jumps > 0 and holds([jumps * step])[0]:
+        x_lambda = jumps * step
+    
+    while (step >= precision):
+        candidates = []
+        candidate = x_lambda
+        for _ in range(10):
+            candidate += step
+            candidates.append(candidate)
+        fulfilled = holds(candidates)
+        
+        if all(fulfilled):
+            x_lambda = candidates[-1] # continuing in the same decade
+            continue
+        first_failed = fulfilled.index(False)
+        if first_failed:
+            x_lambda = candidates[first_failed - 1]
+        step /= 10 # lowering the order of step and continue with better precision
+    
+    return x_lambda, evaluations
+
+def _estimate_lambda(prob, k_of_lambda):
+    """ Rough analytic estimate of the searched lambda (normal approximation of Poisson distribution), no poisson.cdf evaluation needed. """
+    z = NormalDist().inv_cdf(min(max(prob, 1e-9), 1 - 1e-9))
+    
+    # k(lambda) + 1/2 - lambda = z * sqrt(lambda) is solved by bisection of cheap function
+    low, high = 0.0, 1.0
+    while k_of_lambda(high) + 0.5 - high - z * high**0.5 > 0:
+        low, high = high, high * 2
+    for _ in range(50):
+        middle = (low + high) / 2
+        if k_of_lambda(middle) + 0.5 - middle - z * middle**0.5 > 0:
+            low = middle
+        else:
+            high = middle
+    
+    return low
+
+WARM_START_WIDTH = 1000 # first step of bracketing around a warm start is 1/WARM_START_WIDTH of the starting lambda
 
+def _search_lambda_bracket(prob, k_of_lambda, k_scale=None, round_decimals=6, decimals=6, start=None, bracket=None):
+    """ Searching the lambda by bracketing of the crossing point, where rounded poisson.cdf(k(lambda), lambda) meets prob,
+    and narrowing the bracket till the precision given by decimals. Returns the lambda and number of poisson.cdf evaluations.
+    
+    The result is the same as the one of the stepping search: the biggest lambda on the grid of precision, where the rounded
+    cdf is still bigger than rounded prob (the condition is monotonic in lambda). Searching runs on integer multiples of precision.
+    k = k_scale/lambda is floored in poisson.cdf, so the cdf is a step function of lambda. Its jumps (k_scale/j for integer j)
+    are tried directly, the continuous parts between them are narrowed by regula falsi (Illinois variant). """
+    scale = 10**decimals
+    prob_rounded = round(prob, round_decimals)
+    target = prob_rounded + 0.5 / 10**round_decimals # rounded cdf is bigger than rounded prob when cdf reaches this value
+    evaluations = 0
+    
+    def evaluate(n):
+        nonlocal evaluations
+        evaluations += 1
+        x_lambda = n / scale
+        cdf = _poisson_cdf(k_of_lambda(x_lambda), x_lambda)
+        return cdf, round(cdf, round_decimals) > prob_rounded
+    
+    # bracketing around the analytic estimate: condition holds in "low", does not hold in "high" (lambda 0 holds, cdf = 1)
+    # warm start: from the given bracket (its ends are only checked, a wrong one is widened as any other) or around
+    # the given starting estimate (e.g. previous solution for similar inputs)
+    if bracket is not None:
+        estimate = max(int(bracket[0] * scale), 1)
+        width = max(math.ceil(bracket[1] * scale) - estimate, 1)
+    elif start is not None and start > 0:
+        estimate = max(int(start * scale), 1)
+        width = max(estimate // WARM_START_WIDTH, 1)
+    else:
+        estimate = max(int(_estimate_lambda(prob, k_of_lambda) * scale), 1)
+        width = max(estimate // 50, 1)
+    cdf, holds = evaluate(estimate)
+    if holds:
+        low, cdf_low = estimate, cdf
+        while True:
+            high = low + width
+            cdf_high, holds = evaluate(high)
+            if not holds:
+                break
+            low, cdf_low = high, cdf_high
+            width *= 2
+    else:
+        high, cdf_high = estimate, cdf
+        while True:
+            low = high - width
+            if low <= 0:
+                low, cdf_low = 0, 1.0
+                break
+            cdf_low, holds = evaluate(low)
+            if holds:
+                break
+            high, cdf_high = low, cdf_low
+            width *= 2
+    
+    # narrowing the bracket till neighbouring points of the grid
+    side = 0
+    while high - low > 1:
+        if k_scale and not low:
+            # infinitely many jumps near zero lambda: plain bisection
+            middle = (low + high) // 2
+            cdf, holds = evaluate(middle)
+            if holds:
+                low, cdf_low = middle, cdf
+            else:
+                high, cdf_high = middle, cdf
+            continue
+        
+        k_low = math.floor(k_of_lambda(low / scale)) if k_scale else None
+        k_high = math.floor(k_of_lambda(high / scale)) if k_scale else None
+        
+        if k_low != k_high:
+            # jump of cdf inside the bracket: trying the jump in the middle (from k = j to k = j-1) and the point right after it
+            j = (k_high + k_low + 2) // 2
+            middle = int(k_scale / j * scale)
+            if middle == low and middle + 1 < high:
+                middle += 1 # jump right at the low end (e.g. the bracket of the coarse lambda): the point after it
+            elif not (low < middle < high):
+                middle = (low + high) // 2
+            cdf, holds = evaluate(middle)
+            if holds:
+                low, cdf_low = middle, cdf
+                if middle + 1 < high:
+                    cdf, holds = evaluate(middle + 1)
+                    if holds:
+                        low, cdf_low = middle + 1, cdf
+                    else:
+                        high, cdf_high = middle + 1, cdf
+            else:
+                high, cdf_high = middle, cdf
+            side = 0
+            continue
+        
+        # continuous part: regula falsi, Illinois modification avoids slow one-sided convergence
+        middle = low + int(round((cdf_low - target) / (cdf_low - cdf_high) * (high - low)))
+        middle = min(max(middle, low + 1), high - 1)
+        cdf, holds = evaluate(middle)
+        if holds:
+            low, cdf_low = middle, cdf
+            if side == -1:
+                cdf_high = target + (cdf_high - target) / 2
+            side = -1
+        else:
+            high, cdf_high = middle, cdf
+            if side == 1:
+                cdf_low = target + (cdf_low - target) / 2
+            side = 1
+    
+    return low / scale, evaluations
+
+def _search_lambda(prob, k_of_lambda, k_scale=None, method=None, decimals=None, start=None, bracket=None):
+    """ Searching the lambda by given method (LAMBDA_SEARCH_METHOD by default) on the grid of given decimals (LAMBDA_DECIMALS by default).
+    start is an optional starting estimate, bracket optional (low, high) lambdas around the result (the condition holds
+    in low, not in high, e.g. the lambda of a coarser grid and its next grid point); both only warm start the bracket
+    search, they do not change the result. Returns the lambda and number of poisson.cdf evaluations. """
+    method = method or LAMBDA_SEARCH_METHOD
+    decimals = LAMBDA_DECIMALS if decimals is None else decimals
+    if method == "bracket":
+        return _search_lambda_bracket(prob, k_of_lambda, k_scale, decimals=decimals, start=start, bracket=bracket)
+    if method == "stepping":
+        return _search_lambda_stepping(prob, k_of_lambda, decimals=decimals)
+    if method == "decade":
+        return _search_lambda_decade(prob, k_of_lambda, decimals=decimals)
+    
+    raise ValueError(f"Unknown lambda search method: {method}")
+
+
+def calculate_lambda_div(prob, agg, method=None, decimals=None, start=None, bracket=None): 
+    """ Calculates expected value lambda (mean number of occurences) as num1/num vs. num for further use in other calculations.
+    Searching the lambda given probability of occurence and number of events (start: optional warm start, e.g. previous solution,
+    bracket: optional (low, high) lambdas around the result, see _search_lambda). """
+    # The Poisson parameter Lambda (lam) is the total number of events (k) divided by the number of units (n) in the data (lam = k/n).
+    # https://stackoverflow.com/questions/69455797/better-way-to-calculate-%CE%BB-in-a-poisson-distribution-if-the-probability-of-occurr
+    # x_lam = -np.log(1-prob) # analytically only for prob=0 ???
+    method = method or LAMBDA_SEARCH_METHOD
+    decimals = LAMBDA_DECIMALS if decimals is None else decimals
+    x_lambda = _tabulated_lambda("div", prob, agg, method)
+    if x_lambda is not None:
+        return _floor_lambda(x_lambda, decimals)
+    
+    return _cached_lambda(("div", prob, agg, method, decimals),
+                          lambda tier_bracket: _search_lambda(prob, lambda x_lambda: agg/x_lambda, k_scale=agg, method=method,
+                                                              decimals=decimals, start=start, bracket=bracket or tier_bracket)[0])
+
+@_persistent_result
 def calculate_RSA_noUF(capacity_L1, mtu, ipheader, agg, prob):
     """ Calculates L4 RSA (Real Speed Achieved) without impact of Utilization Factor according to the methodics of CTO. """
-    capacity_L4 = calculate_capacity_L4(capacity_L1, mtu, ipheader)
-    lam = calculate_lambda_div(prob, agg)
+    return Scenario(capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, agg=agg, prob=prob).RSA_noUF
+
+def derive_RSA_noUF(capacity_L4, lam, agg):
+    """ RSA without Utilization Factor from already calculated intermediate values (works also with NumPy arrays). """
     RSA = capacity_L4 * lam / agg
     
     return RSA
@@ -112,38 +696,43 @@ def calculate_RSA_noUF(capacity_L1, mtu, ipheader, agg, prob):
 def prepare_RSA_noUF(capacity_L1, mtu, ipheader, agg, prob): 
     """ RSA (Real Speed Achieved) without Utilization Factor for presentation in GUI. """
     output_RSA = calculate_RSA_noUF(capacity_L1, mtu, ipheader, agg, prob)
-    output_RSA = prepare_float(output_RSA, 1)
+    output_RSA = prepare_output("RSA_noUF", output_RSA)
     
     return output_RSA
 
     
-def calculate_lambda_RSA_UF(prob, agg, lu_max): 
+def calculate_lambda_RSA_UF(prob, agg, lu_max, method=None, decimals=None, start=None, bracket=None): 
     """ Calculates expected value lambda (mean number of occurences) for further use in RSA with Utilization Factor calculation.
-    Searching the lambda given probability of occurence and number of events. """
-    
-    round_decimals = 6
-    precision = 1 / (10**round_decimals)
-    
-    # "optimized" brute force: from "biggest" reasonable step to small step to have good final precision and low number of steps
-    step = 100 # big enough step in the start of searching
-    x_lambda = 0
+    Searching the lambda given probability of occurence and number of events (start: optional warm start, e.g. previous solution,
+    bracket: optional (low, high) lambdas around the result, see _search_lambda). """
+    method = method or LAMBDA_SEARCH_METHOD
+    decimals = LAMBDA_DECIMALS if decimals is None else decimals
     
-    # fining the result till desired precision
-    while (step >= precision):
-        # searching with given precision
-        while round(poisson.cdf(k=( lu_max * (agg/(x_lambda + step)) ), mu=(x_lambda + step)), round_decimals) > round(prob, round_decimals):
-            x_lambda += step
-        step /= 10 # lowering the order of step and continue with better precision
+    return _cached_lambda(("RSA_UF", prob, agg, lu_max, method, decimals),
+                          lambda tier_bracket: _search_lambda(prob, lambda x_lambda: lu_max * (agg/x_lambda), k_scale=lu_max*agg,
+                                                              method=method, decimals=decimals, start=start,
+                                                              bracket=bracket or tier_bracket)[0])
 
-    return x_lambda
+def compare_lambda_search_methods(prob, agg, lu_max=None):
+    """ Number of poisson.cdf evaluations needed by each search method for the lambda of calculate_lambda_div
+    (or calculate_lambda_RSA_UF when lu_max is given). Returns dict {method: (lambda, number of evaluations)}. """
+    if lu_max is None:
+        k_of_lambda, k_scale = (lambda x_lambda: agg/x_lambda), agg
+    else:
+        k_of_lambda, k_scale = (lambda x_lambda: lu_max * (agg/x_lambda)), lu_max*agg
+    
+    return {method: _search_lambda(prob, k_of_lambda, k_scale, method=method) for method in ("stepping", "decade", "bracket")}
 
+@_persistent_result
 def calculate_RSA_UF(capacity_L1, mtu, ipheader, agg, nbr_max, nbr_avg, prob):
     """ Calculates L4 RSA (Real Speed Achieved) with impact of Utilization Factor according to the methodics of CTO. """
-    lu_max = calculate_LU_max(capacity_L1, nbr_max)
-    capacity_L4 = calculate_capacity_L4(capacity_L1, mtu, ipheader)
-    lam = calculate_lambda_RSA_UF(prob, agg, lu_max)
-    uf = calculate_UF(nbr_max, nbr_avg)
-    nbr_avg_L4 = calculate_NBR_avg_L4(mtu, ipheader, nbr_avg)
+    scenario = Scenario(capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, agg=agg, nbr_max=nbr_max, nbr_avg=nbr_avg,
+                        prob=prob)
+    
+    return scenario.RSA_UF
+
+def derive_RSA_UF(capacity_L4, nbr_avg_L4, uf, lam, agg):
+    """ RSA with Utilization Factor from already calculated intermediate values (works also with NumPy arrays). """
     RSA = (uf * capacity_L4**2 * lam) / (agg * nbr_avg_L4)
     
     return RSA
@@ -151,7 +740,7 @@ def calculate_RSA_UF(capacity_L1, mtu, ipheader, agg, nbr_max, nbr_avg, prob):
 def prepare_RSA_UF(capacity_L1, mtu, ipheader, agg, nbr_max, nbr_avg, prob): 
     """ RSA (Real Speed Achieved) with Utilization Factor for presentation in GUI. """
     output_RSA = calculate_RSA_UF(capacity_L1, mtu, ipheader, agg, nbr_max, nbr_avg, prob)
-    output_RSA = prepare_float(output_RSA, 1)
+    output_RSA = prepare_output("RSA_UF", output_RSA)
     
     return output_RSA
 
@@ -203,35 +792,59 @@ def prepare_RSA_UF(capacity_L1, mtu, ipheader, agg, nbr_max, nbr_avg, prob):
 #     return output_RSA
 
 
-def calculate_lambda_simple(prob, agg): 
-    """ Calculates expected value lambda (mean number of occurences) as number vs. number for further use in other calculations.
-    Searching the lambda given probability of occurence and number of events. """
+def _invert_lambda_simple(prob, agg, round_decimals=6, decimals=6):
+    """ Lambda for constant k (agg) obtained directly as the inverse of Poisson cdf in its mean: poisson.cdf(k, mu) equals
+    regularized upper incomplete gamma function Q(k+1, mu), its inverse is scipy.special.gammainccinv.
+    Result is snapped to the grid of precision and checked by poisson.cdf to be identical with the searching.
+    Returns the lambda and number of poisson.cdf evaluations. """
+    scale = 10**decimals
+    prob_rounded = round(prob, round_decimals)
+    target = prob_rounded + 0.5 / 10**round_decimals # rounded cdf is bigger than rounded prob when cdf reaches this value
+    evaluations = 0
     
-    round_decimals = 6
-    precision = 1 / (10**round_decimals)
+    def holds(n):
+        nonlocal evaluations
+        evaluations += 1
+        return round(_poisson_cdf(agg, n / scale), round_decimals) > prob_rounded
     
-    # "optimized" brute force: from "biggest" reasonable step to small step to have good final precision and low number of steps
-    step = 100 # big enough step in the start of searching
-    x_lambda = 0
+    # (negative k has cdf 0 and prob over 1 is never reached: the searching would end in zero)
+    if pdtr is None:
+        import_numerics()
+    n = int(gammainccinv(math.floor(agg) + 1, target) * scale) if (target < 1 and agg >= 0) else 0
+    # correction of the last digit (rounding of the inverse function)
+    while n > 0 and not holds(n):
+        n -= 1
+    while holds(n + 1):
+        n += 1
     
-    # fining the result till desired precision
-    while (step >= precision):
-        #print("searching with step ", step)
-        
-        # searching with given precision
-        while round(poisson.cdf(k=agg, mu=(x_lambda + step)), round_decimals) > round(prob, round_decimals):
-            x_lambda += step
-        
-        step /= 10 # lowering the order of step and continue with better precision
+    return n / scale, evaluations
+
+def calculate_lambda_simple(prob, agg, method=None, decimals=None): 
+    """ Calculates expected value lambda (mean number of occurences) as number vs. number for further use in other calculations.
+    Searching the lambda given probability of occurence and number of events.
+    k (agg) does not depend on lambda, so the default method inverts the cdf directly in constant time
+    (no start or bracket as in the other calculate_lambda_* functions, the inversion needs no starting point). """
+    method = method or LAMBDA_SEARCH_METHOD
+    decimals = LAMBDA_DECIMALS if decimals is None else decimals
+    x_lambda = _tabulated_lambda("simple", prob, agg, method)
+    if x_lambda is not None:
+        return _floor_lambda(x_lambda, decimals)
     
-    return x_lambda
+    if method == "bracket":
+        solve = lambda tier_bracket: _invert_lambda_simple(prob, agg, decimals=decimals)[0]
+    else:
+        solve = lambda tier_bracket: _search_lambda(prob, lambda x_lambda: agg, method=method, decimals=decimals)[0]
+    
+    return _cached_lambda(("simple", prob, agg, method, decimals), solve)
 
 
+@_persistent_result
 def calculate_NTP_noUF(capacity_L1, mtu, ipheader, prob, rsa_req):
     """ Calculates NTP (Net Termination Points) without impact of Utilization Factor according to the methodics of CTO. """
-    capacity_L4 = calculate_capacity_L4(capacity_L1, mtu, ipheader)
-    agg_est = aggregation_estimated(capacity_L4, rsa_req)
-    lam = calculate_lambda_simple(prob, agg_est)
+    return Scenario(capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, prob=prob, rsa_req=rsa_req).NTP_noUF
+
+def derive_NTP_noUF(capacity_L4, lam, rsa_req):
+    """ NTP without Utilization Factor from already calculated intermediate values (works also with NumPy arrays). """
     NTP = capacity_L4 * (lam/rsa_req)
     
     return NTP
@@ -239,18 +852,21 @@ def calculate_NTP_noUF(capacity_L1, mtu, ipheader, prob, rsa_req):
 def prepare_NTP_noUF(capacity_L1, mtu, ipheader, prob, rsa_req):
     """ NTP (Net Termination Points) without Utilization Factor for presentation in GUI. """
     output_NTP = calculate_NTP_noUF(capacity_L1, mtu, ipheader, prob, rsa_req)
-    output_NTP = prepare_int(output_NTP)
+    output_NTP = prepare_output("NTP_noUF", output_NTP)
     
     return output_NTP
 
 
+@_persistent_result
 def calculate_NTP_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req):
     """ Calculates NTP (Net Termination Points) with impact of Utilization Factor according to the methodics of CTO. """
-    capacity_L4 = calculate_capacity_L4(capacity_L1, mtu, ipheader)
-    agg_est = aggregation_estimated(capacity_L4, rsa_req)
-    lam = calculate_lambda_simple(prob, agg_est)
-    nbr_avg_L4 = calculate_NBR_avg_L4(mtu, ipheader, nbr_avg)
-    uf = calculate_UF(nbr_max, nbr_avg)
+    scenario = Scenario(capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, nbr_max=nbr_max, nbr_avg=nbr_avg, prob=prob,
+                        rsa_req=rsa_req)
+    
+    return scenario.NTP_UF
+
+def derive_NTP_UF(capacity_L4, nbr_avg_L4, uf, lam, rsa_req):
+    """ NTP with Utilization Factor from already calculated intermediate values (works also with NumPy arrays). """
     NTP = (uf * capacity_L4**2 * lam) / (rsa_req * nbr_avg_L4)
     
     return NTP
@@ -258,16 +874,18 @@ def calculate_NTP_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req
 def prepare_NTP_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req):
     """ NTP (Net Termination Points) with Utilization Factor for presentation in GUI. """
     output_NTP = calculate_NTP_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req)
-    output_NTP = prepare_int(output_NTP)
+    output_NTP = prepare_output("NTP_UF", output_NTP)
     
     return output_NTP
 
 
+@_persistent_result
 def calculate_perf_decrease_noUF(capacity_L1, mtu, ipheader, prob, rsa_req):
     """ Calculates service performance decrease without impact of Utilization Factor according to the methodics of CTO. """
-    capacity_L4 = calculate_capacity_L4(capacity_L1, mtu, ipheader)
-    agg_est = aggregation_estimated(capacity_L4, rsa_req)
-    lam = calculate_lambda_simple(prob, agg_est)
+    return Scenario(capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, prob=prob, rsa_req=rsa_req).perf_decrease_noUF
+
+def derive_perf_decrease_noUF(capacity_L4, lam, rsa_req):
+    """ Service performance decrease without Utilization Factor from already calculated intermediate values (works also with NumPy arrays). """
     rsa_max = capacity_L4 / lam
     rsa_sigma = rsa_max - rsa_req
     perf_decrease = (rsa_sigma / rsa_max) * 100 
@@ -277,18 +895,21 @@ def calculate_perf_decrease_noUF(capacity_L1, mtu, ipheader, prob, rsa_req):
 def prepare_perf_decrease_noUF(capacity_L1, mtu, ipheader, prob, rsa_req):
     """ Service performance decrease without Utilization Factor for presentation in GUI. """
     output_perf = calculate_perf_decrease_noUF(capacity_L1, mtu, ipheader, prob, rsa_req)
-    output_perf = prepare_float(output_perf, 1)
+    output_perf = prepare_output("perf_decrease_noUF", output_perf)
     
     return output_perf
 
 
+@_persistent_result
 def calculate_perf_decrease_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req):
     """ Calculates service performance decrease with impact of Utilization Factor according to the methodics of CTO. """
-    capacity_L4 = calculate_capacity_L4(capacity_L1, mtu, ipheader)
-    nbr_avg_L4 = calculate_NBR_avg_L4(mtu, ipheader, nbr_avg)
-    uf = calculate_UF(nbr_max, nbr_avg)
-    ntp_est = int( (uf * capacity_L4**2)/(rsa_req * nbr_avg_L4) )
-    lam = calculate_lambda_simple(prob, ntp_est)
+    scenario = Scenario(capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, nbr_max=nbr_max, nbr_avg=nbr_avg, prob=prob,
+                        rsa_req=rsa_req)
+    
+    return scenario.perf_decrease_UF
+
+def derive_perf_decrease_UF(capacity_L4, nbr_avg_L4, uf, lam, rsa_req):
+    """ Service performance decrease with Utilization Factor from already calculated intermediate values (works also with NumPy arrays). """
     rsa_max = (uf * capacity_L4**2) / (lam * nbr_avg_L4)
     rsa_sigma = rsa_max - rsa_req
     perf_decrease = (rsa_sigma / rsa_max) * 100 
@@ -298,14 +919,18 @@ def calculate_perf_decrease_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, pro
 def prepare_perf_decrease_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req):
     """ Service performance decrease without Utilization Factor for presentation in GUI. """
     output_perf = calculate_perf_decrease_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req)
-    output_perf = prepare_float(output_perf, 1)
+    output_perf = prepare_output("perf_decrease_UF", output_perf)
     
     return output_perf
 
 
+@_persistent_result
 def calculate_BW_min(mtu, ipheader, agg, prob, rsa_req):
     """ Calculates L3 minimal bandwidth of bottleneck according to the methodics of CTO. """
-    lam = calculate_lambda_div(prob, agg)
+    return Scenario(mtu=mtu, ipheader=ipheader, agg=agg, prob=prob, rsa_req=rsa_req).BW_min
+
+def derive_BW_min(mtu, ipheader, agg, lam, rsa_req):
+    """ L3 minimal bandwidth from already calculated lambda (works also with NumPy arrays). """
     BW = ( (rsa_req * (agg / lam)) * (mtu - ipheader) ) / (mtu - ipheader - 8)
     
     return BW
@@ -313,23 +938,176 @@ def calculate_BW_min(mtu, ipheader, agg, prob, rsa_req):
 def prepare_BW_min(mtu, ipheader, agg, prob, rsa_req):
     """ L3 minimal bandwidth for presentation in GUI. """
     output_BW = calculate_BW_min(mtu, ipheader, agg, prob, rsa_req)
-    output_BW = prepare_float(output_BW, 1)
+    output_BW = prepare_output("BW_min", output_BW)
     
     return output_BW
 
 
+@_persistent_result
 def calculate_capacity_min(mtu, ipheader, agg, nbr_max, nbr_avg, prob, rsa_req):
     """ Calculates L3 minimal capacity of bottleneck according to the methodics of CTO. """
-    uf = calculate_UF(nbr_max, nbr_avg)
-    lam = calculate_lambda_div(prob, agg)
+    scenario = Scenario(mtu=mtu, ipheader=ipheader, agg=agg, nbr_max=nbr_max, nbr_avg=nbr_avg, prob=prob, rsa_req=rsa_req)
+    
+    return scenario.capacity_min
+
+def derive_capacity_min(mtu, ipheader, agg, nbr_avg, uf, lam, rsa_req):
+    """ L3 minimal capacity from already calculated intermediate values (works also with NumPy arrays). """
     capacity_L3 = ( ( ( (rsa_req * agg * nbr_avg) / (uf * lam) )**0.5 ) * (mtu - ipheader) ) / (mtu - ipheader - 8)
     
     return capacity_L3
 
 def prepare_capacity_min(mtu, ipheader, agg, nbr_max, nbr_avg, prob, rsa_req):
     """ L3 minimal capacity for presentation in GUI. """
-    output_cap = calculate_capacity_min(mtu, ipheader, agg, nbr_max, nbr_avg, prob, rsa_req)
-    output_cap = prepare_float(output_cap, 1)
+    output_capacity = calculate_capacity_min(mtu, ipheader, agg, nbr_max, nbr_avg, prob, rsa_req)
+    output_capacity = prepare_output("capacity_min", output_capacity)
+    
+    return output_capacity
+
+
+# the formula graph of the calculations shared by Scenario, the dependency graph of GUI (app_graph) and the batch
+# (app_batch): value name -> (function, names of the inputs or values used as its arguments), in the order of evaluation
+INPUTS = ("capacity_L1", "mtu", "ipheader", "agg", "nbr_max", "nbr_avg", "prob", "rsa_req")
+FORMULAS = {
+    # intermediate values
+    "capacity_L4": (calculate_capacity_L4, ("capacity_L1", "mtu", "ipheader")),
+    "nbr_avg_L4": (calculate_NBR_avg_L4, ("mtu", "ipheader", "nbr_avg")),
+    "LU_max": (calculate_LU_max, ("capacity_L1", "nbr_max")),
+    "UF": (calculate_UF, ("nbr_max", "nbr_avg")),
+    "agg_est": (aggregation_estimated, ("capacity_L4", "rsa_req")),
+    "ntp_est": (ntp_estimated, ("capacity_L4", "nbr_avg_L4", "UF", "rsa_req")),
+    "lam_div": (calculate_lambda_div, ("prob", "agg")),
+    "lam_RSA_UF": (calculate_lambda_RSA_UF, ("prob", "agg", "LU_max")),
+    "lam_agg_est": (calculate_lambda_simple, ("prob", "agg_est")),
+    "lam_ntp_est": (calculate_lambda_simple, ("prob", "ntp_est")),
+    # outputs
+    "LU_avg": (calculate_LU_avg, ("capacity_L1", "nbr_avg")),
+    "RSA_noUF": (derive_RSA_noUF, ("capacity_L4", "lam_div", "agg")),
+    "RSA_UF": (derive_RSA_UF, ("capacity_L4", "nbr_avg_L4", "UF", "lam_RSA_UF", "agg")),
+    "NTP_noUF": (derive_NTP_noUF, ("capacity_L4", "lam_agg_est", "rsa_req")),
+    "NTP_UF": (derive_NTP_UF, ("capacity_L4", "nbr_avg_L4", "UF", "lam_agg_est", "rsa_req")),
+    "perf_decrease_noUF": (derive_perf_decrease_noUF, ("capacity_L4", "lam_agg_est", "rsa_req")),
+    "perf_decrease_UF": (derive_perf_decrease_UF, ("capacity_L4", "nbr_avg_L4", "UF", "lam_ntp_est", "rsa_req")),
+    "BW_min": (derive_BW_min, ("mtu", "ipheader", "agg", "lam_div", "rsa_req")),
+    "capacity_min": (derive_capacity_min, ("mtu", "ipheader", "agg", "nbr_avg", "UF", "lam_div", "rsa_req")),
+}
+LAMBDAS = ("lam_div", "lam_RSA_UF", "lam_agg_est", "lam_ntp_est") # values solved by calculate_lambda_* (take decimals)
+OUTPUTS = tuple(DISPLAY_DECIMALS)
+
+@dataclasses.dataclass(frozen=True)
+class Scenario:
+    """ Inputs of one link scenario with lazily calculated outputs and intermediate values (FORMULAS: capacity_L4,
+    lambdas...), each is calculated at most once per scenario and shared by all the outputs using it. Inputs not needed by
+    the requested outputs can be left out, e.g. Scenario(mtu=1500, ipheader=20, agg=256, prob=0.9, rsa_req=10).BW_min.
+    The values are identical with the calculate_* functions (same formulas), the scenario is immutable (frozen),
+    dataclasses.replace() gives a new one with own calculations. """
     
-    return output_cap
+    capacity_L1: Optional[float] = None
+    mtu: Optional[float] = None
+    ipheader: Optional[float] = None
+    agg: Optional[float] = None
+    nbr_max: Optional[float] = None
+    nbr_avg: Optional[float] = None
+    prob: Optional[float] = None
+    rsa_req: Optional[float] = None
+    
+    OUTPUTS = OUTPUTS
+    
+    def __getattr__(self, name):
+        """ Value of FORMULAS calculated on the first access (called only for attributes not set yet). """
+        if name not in FORMULAS:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        function, arguments = FORMULAS[name]
+        value = function(*(getattr(self, argument) for argument in arguments))
+        object.__setattr__(self, name, value) # (instance attribute of the frozen dataclass, found before __getattr__)
+        
+        return value
+    
+    def outputs(self):
+        """ Dict of all the outputs (all inputs must be set). """
+        return {name: getattr(self, name) for name in self.OUTPUTS}
+
+
+# goal seek: the largest aggregation still meeting the required SDR (RSA), instead of changing agg by hand
+GOAL_SEEK_MAX_AGG = 99999 # upper limit of the searched aggregation (maximum of the GUI input)
+
+# agg: the largest aggregation meeting rsa_req (None when not even agg 1 does), i.e. the number of NTPs sharing the link
+# with the required SDR each, RSA: its RSA (SDR), evaluations: RSA values (lambdas) calculated by the seek
+GoalSeekResult = collections.namedtuple("GoalSeekResult", "agg RSA evaluations")
+
+def seek_max_aggregation(rsa_of_agg, rsa_req, max_agg=GOAL_SEEK_MAX_AGG):
+    """ The largest aggregation 1..max_agg whose RSA (function of agg) reaches rsa_req. RSA does not increase with agg
+    (lambda/agg is a staircase falling with agg, only the flooring of lambdas to the grid makes differences below 1e-6),
+    so the aggregation meeting the requirement is bracketed by doubling and then bisected: ~2*log2(agg) RSA values
+    instead of trying the aggregations one by one. Returns the aggregation (None) and the number of RSA evaluations. """
+    evaluations = 0
+
+    def meets(agg):
+        nonlocal evaluations
+        evaluations += 1
+        return rsa_of_agg(agg) >= rsa_req
+
+    if not meets(1):
+        return None, evaluations
+    low, high = 1, 2 # low meets the requirement, high is the first one not tried yet
+    while high <= max_agg and meets(high):
+        low, high = high, high * 2
+    high = min(high, max_agg + 1) # (first aggregation missing the requirement or out of range)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if meets(middle):
+            low = middle
+        else:
+            high = middle
+
+    return low, evaluations
+
+def _warm_started(calculate_lambda):
+    """ calculate_lambda(agg, start, bracket) wrapped to reuse the lambdas of the aggregations solved so far (lambda does
+    not decrease with agg): between two of them their lambdas are the bracket of the search, otherwise it starts from
+    the lambda of the nearest one scaled to agg (lambda grows roughly linearly with agg). The results are not changed. """
+    solved = {}
+
+    def lambda_of_agg(agg):
+        lower = max((solved_agg for solved_agg in solved if solved_agg < agg), default=None)
+        upper = min((solved_agg for solved_agg in solved if solved_agg > agg), default=None)
+        start = bracket = None
+        if lower is not None and upper is not None:
+            bracket = (solved[lower], solved[upper] + 10**-LAMBDA_DECIMALS)
+        elif solved:
+            nearest = lower if upper is None else upper
+            start = solved[nearest] * agg / nearest
+        solved[agg] = calculate_lambda(agg, start, bracket)
+        return solved[agg]
+
+    return lambda_of_agg
+
+def _goal_seek_result(rsa_of_agg, rsa_req, max_agg):
+    agg, evaluations = seek_max_aggregation(rsa_of_agg, rsa_req, max_agg)
+
+    return GoalSeekResult(agg, None if agg is None else rsa_of_agg(agg), evaluations)
+
+def max_aggregation_noUF(capacity_L1, mtu, ipheader, prob, rsa_req, max_agg=GOAL_SEEK_MAX_AGG):
+    """ The largest aggregation meeting the required SDR rsa_req without Utilization Factor (GoalSeekResult). """
+    capacity_L4 = calculate_capacity_L4(capacity_L1, mtu, ipheader)
+    lam_div = _warm_started(lambda agg, start, bracket: calculate_lambda_div(prob, agg, start=start, bracket=bracket))
+
+    return _goal_seek_result(lambda agg: derive_RSA_noUF(capacity_L4, lam_div(agg), agg), rsa_req, max_agg)
+
+def max_aggregation_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req, max_agg=GOAL_SEEK_MAX_AGG):
+    """ The largest aggregation meeting the required SDR rsa_req with Utilization Factor (GoalSeekResult). """
+    scenario = Scenario(capacity_L1=capacity_L1, mtu=mtu, ipheader=ipheader, nbr_max=nbr_max, nbr_avg=nbr_avg)
+    capacity_L4, nbr_avg_L4, uf, lu_max = scenario.capacity_L4, scenario.nbr_avg_L4, scenario.UF, scenario.LU_max
+    lam_RSA_UF = _warm_started(lambda agg, start, bracket: calculate_lambda_RSA_UF(prob, agg, lu_max, start=start, bracket=bracket))
+
+    return _goal_seek_result(lambda agg: derive_RSA_UF(capacity_L4, nbr_avg_L4, uf, lam_RSA_UF(agg), agg), rsa_req, max_agg)
+
+def goal_seek_aggregation(capacity_L1, mtu, ipheader, prob, rsa_req, nbr_max=None, nbr_avg=None, max_agg=GOAL_SEEK_MAX_AGG):
+    """ The largest aggregation meeting the required SDR rsa_req for the given link, without Utilization Factor and,
+    when both NBRs are given, with it. Lambdas come from the usual caches and tables (repeated seeks and the GUI share
+    them), new ones are solved with a warm start. Degenerate inputs raise the errors of the formulas (e.g. ZeroDivisionError
+    for zero NBR at L4). Returns dict {"noUF": GoalSeekResult, "UF": GoalSeekResult or None}. """
+    results = {"noUF": max_aggregation_noUF(capacity_L1, mtu, ipheader, prob, rsa_req, max_agg), "UF": None}
+    if nbr_max is not None and nbr_avg is not None:
+        results["UF"] = max_aggregation_UF(capacity_L1, mtu, ipheader, nbr_max, nbr_avg, prob, rsa_req, max_agg)
 
+    return results
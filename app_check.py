@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Regression check of the lambda searching: every search method and every source of lambdas gives the same lambdas as
+the reference stepping search (app_calc._search_lambda_stepping, the original brute force) on a fixed grid of inputs.
+
+  - scalar methods: "decade" must be bit-identical with stepping, "bracket" (incl. the direct inversion of
+    calculate_lambda_simple) the same on the grid of precision, both for full precision and the coarse tier
+    (coarse tier of "bracket" is the full precision lambda floored, stepping on the coarse grid can end one step
+    lower, e.g. 0.149 + 0.001 = 0.15000000000000002 does not fulfill the condition, while 0.15 does)
+  - warm starts of the bracket search (start, bracket of the coarse tier lambda or a wrong one) do not change lambdas
+  - lambdas derived from the other precision tier in the cache are the same as the searched ones
+  - precomputed tables (app_tables, generated for the grid into a temporary file) give the same lambdas
+  - vectorized app_batch methods (bisection, inversion, stepping) give the same lambdas
+  - outputs of app_batch.calculate_all are identical with the calculation graph of GUI (app_graph)
+
+  python app_check.py           (exit code 1 when some value differs)
+  python app_check.py --quick   (smaller grid)
+"""
+
+import argparse
+import itertools
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import app_batch as ab
+import app_calc as ac
+import app_graph as ag
+import app_tables
+
+PROBABILITIES = (0.5, 0.9, 0.95, 0.99)
+AGGREGATIONS = (1, 2, 3, 5, 8, 13, 64, 100, 256, 1000, 2500, 10000, 99999)
+LINK_UTILIZATIONS = (0.05, 0.4, 1.0) # lu_max of the RSA_UF lambda
+SIMPLE_AGGREGATIONS = (0, 1, 7, 100, 999, 5000, 99999, 1000000) # estimated aggregations (k of the simple lambda)
+TABLES_AGG_MAX = 3000 # the tables are generated up to this aggregation (whole GUI range takes too long for a check)
+
+# records of the output check (GUI inputs incl. degenerate ones, e.g. MTU 60 B with IPv6 has zero L4 capacity)
+RECORD_GRID = {
+    "capacity_L1": (1, 100, 2500),
+    "mtu": (60, 1500),
+    "ipheader": (20, 40),
+    "agg": (1, 64, 2500),
+    "nbr_max": (10,),
+    "nbr_avg": (5,),
+    "prob": (0.9, 0.95),
+    "rsa_req": (2, 50),
+}
+
+
+def lambda_cases(quick=False):
+    """ (kind, arguments of calculate_lambda_<kind>) of the grid. """
+    probabilities = PROBABILITIES[1:3] if quick else PROBABILITIES
+    aggregations = AGGREGATIONS[::3] if quick else AGGREGATIONS
+    cases = [("div", (prob, agg)) for prob in probabilities for agg in aggregations]
+    cases += [("RSA_UF", (prob, agg, lu_max)) for prob in probabilities for agg in aggregations for lu_max in LINK_UTILIZATIONS]
+    cases += [("simple", (prob, agg)) for prob in probabilities for agg in SIMPLE_AGGREGATIONS]
+
+    return cases
+
+def _k_of_lambda(kind, arguments):
+    if kind == "div":
+        prob, agg = arguments
+        return lambda x_lambda: agg/x_lambda
+    if kind == "RSA_UF":
+        prob, agg, lu_max = arguments
+        return lambda x_lambda: lu_max * (agg/x_lambda)
+    prob, agg = arguments
+    return lambda x_lambda: agg
+
+def reference_lambda(kind, arguments, decimals=ac.LAMBDA_DECIMALS, floored=False):
+    """ Lambda of the original stepping search on the grid of decimals, or the full precision one floored to them. """
+    if floored:
+        return ac._floor_lambda(reference_lambda(kind, arguments), decimals)
+    return ac._search_lambda_stepping(arguments[0], _k_of_lambda(kind, arguments), decimals=decimals)[0]
+
+def _calculate_lambda(kind):
+    return {"div": ac.calculate_lambda_div, "RSA_UF": ac.calculate_lambda_RSA_UF, "simple": ac.calculate_lambda_simple}[kind]
+
+def _batch_lambda(kind):
+    return {"div": ab.calculate_lambda_div, "RSA_UF": ab.calculate_lambda_RSA_UF, "simple": ab.calculate_lambda_simple}[kind]
+
+def _same(expected, result, decimals, exact=False):
+    if exact:
+        return result == expected
+    return round(result, decimals) == round(expected, decimals)
+
+
+def check_methods(cases, references):
+    """ Scalar calculate_lambda_* of the search methods against the reference, list of mismatches. """
+    mismatches = []
+    for method in ("decade", "bracket"):
+        for tier, decimals in ac.PRECISION_TIERS.items():
+            ac.lambda_cache.clear()
+            for kind, arguments in cases:
+                expected = references[kind, arguments, decimals, method == "bracket"]
+                result = _calculate_lambda(kind)(*arguments, method=method, decimals=decimals)
+                if not _same(expected, result, decimals, exact=method == "decade"):
+                    mismatches.append((f"{method} {tier}", kind, arguments, expected, result))
+
+    return mismatches
+
+def check_warm_starts(cases, references):
+    """ Bracket search of calculate_lambda_div/RSA_UF with warm starts against the reference, list of mismatches. """
+    coarse = ac.PRECISION_TIERS["coarse"]
+    mismatches = []
+    for kind, arguments in cases:
+        if kind == "simple":
+            continue # (inverted directly, no warm start)
+        expected = references[kind, arguments, ac.LAMBDA_DECIMALS, True]
+        lower = references[kind, arguments, coarse, True]
+        warm_starts = {"start": {"start": expected * 1.01},
+                       "coarse bracket": {"bracket": (lower, lower + 10**-coarse)},
+                       "wrong bracket": {"bracket": (expected * 2, expected * 3)}}
+        for name, warm_start in warm_starts.items():
+            ac.lambda_cache.clear()
+            result = _calculate_lambda(kind)(*arguments, method="bracket", **warm_start)
+            if not _same(expected, result, ac.LAMBDA_DECIMALS):
+                mismatches.append((name, kind, arguments, expected, result))
+
+    return mismatches
+
+def check_tiers(cases, references):
+    """ Lambdas of one precision tier derived from the other one in the cache (the full precision one searched from
+    the bracket of the cached coarse lambda, the coarse one floored from the cached full precision lambda). """
+    coarse = ac.PRECISION_TIERS["coarse"]
+    mismatches = []
+    for first, second in ((coarse, ac.LAMBDA_DECIMALS), (ac.LAMBDA_DECIMALS, coarse)):
+        for kind, arguments in cases:
+            ac.lambda_cache.clear()
+            _calculate_lambda(kind)(*arguments, method="bracket", decimals=first)
+            expected = references[kind, arguments, second, True]
+            result = _calculate_lambda(kind)(*arguments, method="bracket", decimals=second)
+            if not _same(expected, result, second):
+                mismatches.append((f"tier {second} after {first}", kind, arguments, expected, result))
+
+    return mismatches
+
+def check_tables(cases, references):
+    """ Lambdas read from the tables generated for the grid against the reference, list of mismatches. """
+    mismatches = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = app_tables.generate_tables(os.path.join(directory, "lambda_tables.bin"), PROBABILITIES, TABLES_AGG_MAX)
+        ac.load_lambda_tables(path)
+        try:
+            tables = ac.lambda_tables()
+            for tier, decimals in ac.PRECISION_TIERS.items():
+                ac.lambda_cache.clear()
+                for kind, arguments in cases:
+                    if kind not in app_tables.KINDS or tables.lookup(kind, *arguments) is None:
+                        continue # out of the tables
+                    expected = references[kind, arguments, decimals, True]
+                    result = _calculate_lambda(kind)(*arguments, method="bracket", decimals=decimals)
+                    if not _same(expected, result, decimals):
+                        mismatches.append((f"tables {tier}", kind, arguments, expected, result))
+        finally:
+            ac.load_lambda_tables(False)
+            del tables # (the mapping of the file is released before the directory is removed)
+
+    return mismatches
+
+def check_batch(cases, references):
+    """ Vectorized app_batch lambdas of the search methods against the reference, list of mismatches. """
+    mismatches = []
+    for method in ("stepping", "bracket"):
+        for tier, decimals in ac.PRECISION_TIERS.items():
+            ac.lambda_cache.clear()
+            for kind in ("div", "RSA_UF", "simple"):
+                kind_cases = [arguments for case_kind, arguments in cases if case_kind == kind]
+                columns = [np.array(column, dtype=float) for column in zip(*kind_cases)]
+                results = _batch_lambda(kind)(*columns, method=method, decimals=decimals)
+                for arguments, result in zip(kind_cases, results.tolist()):
+                    expected = references[kind, arguments, decimals, method == "bracket"]
+                    if not _same(expected, result, decimals):
+                        mismatches.append((f"batch {method} {tier}", kind, arguments, expected, result))
+
+    return mismatches
+
+def check_outputs(records):
+    """ Outputs of app_batch.calculate_all against the calculation graph of GUI, list of mismatches. """
+    ac.lambda_cache.clear()
+    columns = {name: np.array([record[name] for record in records], dtype=float) for name in ag.INPUTS}
+    results = ab.calculate_all(**columns)
+    mismatches = []
+    for index, record in enumerate(records):
+        graph = ag.CalculationGraph()
+        graph.update(record)
+        for name in ag.OUTPUTS:
+            expected = graph.values[name]
+            expected = None if isinstance(expected, ag.CalculationError) or not math.isfinite(expected) else expected
+            result = results[name][index]
+            result = float(result) if math.isfinite(result) else None
+            if result != expected:
+                mismatches.append(("batch outputs", name, tuple(record.values()), expected, result))
+
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regression check of lambda search methods, tables and batch against the stepping search.")
+    parser.add_argument("--quick", action="store_true", help="smaller grid")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    ac.load_lambda_tables(False) # lambdas are solved unless the tables are checked
+    cases = lambda_cases(args.quick)
+    references = {(kind, arguments, decimals, floored): reference_lambda(kind, arguments, decimals, floored)
+                  for kind, arguments in cases for decimals in set(ac.PRECISION_TIERS.values()) for floored in (False, True)}
+    records = [dict(zip(RECORD_GRID, values)) for values in itertools.product(*RECORD_GRID.values())]
+    if args.quick:
+        records = records[::4]
+
+    mismatches = []
+    for name, check, arguments in (("search methods", check_methods, (cases, references)),
+                                   ("warm starts", check_warm_starts, (cases, references)),
+                                   ("precision tiers", check_tiers, (cases, references)),
+                                   ("tables", check_tables, (cases, references)),
+                                   ("batch", check_batch, (cases, references)),
+                                   ("batch outputs", check_outputs, (records,))):
+        found = check(*arguments)
+        print(f"{name}: {len(found)} mismatches")
+        mismatches += found
+    for source, kind, arguments, expected, result in mismatches[:20]:
+        print(f"  {source}, {kind}{arguments}: expected {expected!r}, got {result!r}")
+    print(f"{len(cases)} lambdas, {len(records)} output records: {len(mismatches)} mismatches ({time.perf_counter() - start:.1f} s)")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
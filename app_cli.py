@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Headless (command line) batch calculation, no GUI libraries are needed.
+
+Rows of inputs are read from CSV (header with column names) or JSON Lines (object per line), calculated in chunks
+by the vectorized functions of app_batch and written incrementally, so the memory use does not depend on the file size.
+Columns: capacity_L1, mtu, ipheader, agg, nbr_max, nbr_avg, prob (0.9 = 90 %), rsa_req; other columns are copied to the
+output (CSV output: those of the first row). Missing columns can be given as constants (--set name=value). Results are
+raw (not rounded) values of all outputs, lambdas of the precision tier --precision (app_calc.PRECISION_TIERS, coarse
+is quicker but approximate, full by default).
+
+  python app_cli.py inventory.csv -o results.csv
+  python app_cli.py inventory.jsonl --set prob=0.95 --format csv > results.csv
+  python app_cli.py inventory.csv -o results.csv --workers 32
+  python app_cli.py inventory.csv --store results/
+  python app_cli.py inventory.csv -o estimates.csv --precision coarse
+
+With --store the inputs and outputs are appended to the columnar store (app_store, .npy column per value opened
+memory-mapped by the analysis) instead of the output file (unless -o is given too).
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import app_batch as ab
+import app_calc as ac
+import app_store
+
+INPUTS = ac.INPUTS
+OUTPUTS = ac.Scenario.OUTPUTS
+FORMATS = ("csv", "jsonl")
+PROGRESS_INTERVAL = 5 # [s] interval of progress reports
+
+
+class InputError(ValueError):
+    """ Invalid content of the input file. """
+
+
+def detect_format(path, default="csv"):
+    """ Format given by the file extension (.jsonl/.json = JSON Lines, otherwise CSV). """
+    extension = os.path.splitext(path or "")[1].lower()
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+
+    return default
+
+def read_rows(file, input_format):
+    """ Iterator of input rows (dicts) of the CSV or JSON Lines file. """
+    if input_format == "csv":
+        yield from csv.DictReader(file)
+        return
+
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exception:
+            raise InputError(f"line {line_number}: {exception}") from None
+        if not isinstance(row, dict):
+            raise InputError(f"line {line_number}: JSON object expected")
+        yield row
+
+def calculate_chunk(rows, constants, first_row_number, executor=None, store=None, run=None, precision=None):
+    """ Calculates all the outputs for the chunk of rows, returns the rows extended by the outputs.
+    store (app_store.ResultStore) gets the inputs and outputs appended, run: information about the source for the store,
+    precision: name of the precision tier of lambdas (app_calc.PRECISION_TIERS, full by default). """
+    columns = input_columns(rows, constants, first_row_number)
+    results = ab.calculate_all(**columns, executor=executor, precision=precision)
+    if store is not None:
+        store.append({**columns, **results}, run=run)
+
+    return result_rows(rows, results)
+
+def input_columns(rows, constants, first_row_number):
+    """ Dict {input: list of values} of the chunk of rows, InputError for missing or invalid values. """
+    columns = {}
+    for name in INPUTS:
+        try:
+            columns[name] = [float(row[name]) if name in row else constants[name] for row in rows]
+        except KeyError:
+            raise InputError(f"missing input column: {name} (use --set {name}=value for a constant)") from None
+        except (TypeError, ValueError):
+            for row_number, row in enumerate(rows, start=first_row_number):
+                try:
+                    float(row.get(name, constants.get(name)))
+                except (TypeError, ValueError):
+                    raise InputError(f"row {row_number}: invalid value of {name}: {row.get(name)!r}") from None
+            raise
+
+    return columns
+
+def result_rows(rows, results):
+    """ Rows extended by the outputs (results of app_batch.calculate_all). """
+    return [{**row, **dict(zip(OUTPUTS, values))} for row, values in zip(rows, zip(*(_numbers(results[name]) for name in OUTPUTS)))]
+
+def _numbers(values):
+    """ Output values as Python numbers, None where they can not be calculated (e.g. division by zero). """
+    numbers = np.asarray(values, dtype=float).astype(object)
+    numbers[~np.isfinite(values)] = None
+
+    return numbers.tolist()
+
+
+class RowWriter:
+    """ Incremental writer of result rows in CSV or JSON Lines format. """
+
+    def __init__(self, file, output_format):
+        self.file = file
+        self.output_format = output_format
+        self._csv_writer = None
+        self._dropped = set() # columns of later rows missing in the CSV header (reported once)
+
+    def write(self, rows):
+        if self.output_format == "jsonl":
+            self.file.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        else:
+            if self._csv_writer is None: # copied columns of the first row and all the outputs
+                columns = [name for name in rows[0] if name not in OUTPUTS] + list(OUTPUTS)
+                self._csv_writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+                self._csv_writer.writeheader()
+            dropped = set().union(*rows).difference(self._csv_writer.fieldnames, self._dropped)
+            if dropped:
+                print(f"warning: columns not in the CSV header (first row) are left out: {', '.join(sorted(dropped))}", file=sys.stderr)
+                self._dropped |= dropped
+            self._csv_writer.writerows(rows)
+        self.file.flush()
+
+
+def run(input_file, output_file, input_format="csv", output_format="csv", constants=None, chunk_size=10000, progress=None,
+        executor=None, store=None, precision="full"):
+    """ Streams the rows from the input to the output file (None = no file), returns (number of rows, duration in s).
+    progress(rows, duration) is called every PROGRESS_INTERVAL seconds, executor (process pool) solves lambdas in parallel,
+    store (app_store.ResultStore) gets the inputs and outputs appended, precision: name of the precision tier of lambdas. """
+    constants = constants or {}
+    writer = RowWriter(output_file, output_format) if output_file is not None else None
+    start = last_report = time.perf_counter()
+    count = 0
+
+    source = {"source": getattr(input_file, "name", None), "constants": constants, "precision": precision}
+    rows = read_rows(input_file, input_format)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        results = calculate_chunk(chunk, constants, count + 1, executor=executor, store=store, run=source, precision=precision)
+        if writer is not None:
+            writer.write(results)
+        count += len(chunk)
+
+        now = time.perf_counter()
+        if progress is not None and now - last_report >= PROGRESS_INTERVAL:
+            progress(count, now - start)
+            last_report = now
+
+    return count, time.perf_counter() - start
+
+
+def parse_constant(text):
+    """ name=value argument of --set. """
+    name, separator, value = text.partition("=")
+    if not separator or name not in INPUTS:
+        raise argparse.ArgumentTypeError(f"expected name=value, name one of: {', '.join(INPUTS)}")
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value}") from None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch calculation of the net capacity impact (CSV/JSON Lines).")
+    parser.add_argument("input", help="input file (CSV with header or JSON Lines), - = standard input")
+    parser.add_argument("-o", "--output", help="output file, - = standard output (default without --store)")
+    parser.add_argument("--input-format", choices=FORMATS, help="format of the input (by file extension by default)")
+    parser.add_argument("--format", choices=FORMATS, dest="output_format", help="format of the output (by file extension, or input format)")
+    parser.add_argument("--set", type=parse_constant, action="append", default=[], metavar="NAME=VALUE",
+                        help="constant value of an input missing in the file (can be repeated)")
+    parser.add_argument("--store", metavar="DIRECTORY", help="append inputs and outputs to the columnar store (app_store)")
+    parser.add_argument("--precision", choices=list(ac.PRECISION_TIERS), default="full",
+                        help="precision tier of lambdas (coarse = quicker, approximate; default full)")
+    parser.add_argument("--chunk-size", type=int, help="rows calculated at once (default 10000, 10000 x workers with --workers)")
+    parser.add_argument("-w", "--workers", type=int, help="number of processes solving distinct lambdas in parallel (0 = all CPUs)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress and speed report (standard error)")
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format or detect_format(args.input)
+    output = args.output or (None if args.store else "-")
+    output_format = args.output_format or detect_format(output, default=input_format)
+    report = (lambda rows, duration: None) if args.quiet else \
+             (lambda rows, duration: print(f"{rows} rows in {duration:.1f} s ({rows / duration:.0f} rows/s)", file=sys.stderr))
+
+    # distinct lambdas of each chunk are solved once and spread over the process pool, bigger chunks give more work to share
+    executor = ab.pool_executor(args.workers or None) if args.workers is not None else None
+    chunk_size = args.chunk_size or 10000
+    if executor is not None and not args.chunk_size:
+        chunk_size *= max(args.workers or os.cpu_count() or 1, 1)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    output_file = sys.stdout if output == "-" else None if output is None else open(output, "w", newline="", encoding="utf-8")
+    opened_files = [file for file in (input_file, output_file) if file not in (sys.stdin, sys.stdout, None)]
+    try:
+        rows, duration = run(input_file, output_file, input_format, output_format, dict(args.set),
+                             chunk_size=max(chunk_size, 1), progress=report, executor=executor,
+                             store=app_store.ResultStore(args.store) if args.store else None, precision=args.precision)
+    except (InputError, app_store.StoreError) as exception:
+        parser.exit(2, f"{parser.prog}: error: {exception}\n")
+    except BrokenPipeError: # output closed by the reader (e.g. head)
+        sys.stdout = None # no flushing at exit
+        return 1
+    finally:
+        for file in opened_files:
+            file.close()
+        if executor is not None:
+            executor.shutdown()
+
+    report(rows, max(duration, 1e-9))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
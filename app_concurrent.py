@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent calculation of many scenarios (e.g. in a threaded planning service), based on concurrent.futures.
+
+Record: mapping with the input values (app_graph.INPUTS), result: dict {output: raw value} of all the outputs
+(app_graph.CalculationError instead of a value which can not be calculated). Each record is calculated by its own
+calculation graph and the functions of app_calc are thread safe (their caches are locked), so the results do not depend
+on the number of threads nor on their timing - they are identical with sequential calculation. Threads run in parallel
+in free-threaded CPython builds, with GIL they share one core.
+
+  with ScenarioExecutor(max_workers=8) as executor:
+      futures = executor.submit_all(records) # futures in order of the records
+      for result in executor.map(records): # results in order of the records
+          ...
+
+python app_concurrent.py runs the stress check comparing concurrent and sequential results (of the calculation graphs
+and of the public calculate_*/prepare_* functions of app_calc with the persistent cache).
+"""
+
+import argparse
+import collections
+import inspect
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import app_calc as ac
+import app_graph as ag
+
+INPUTS = ag.INPUTS
+OUTPUTS = tuple(ag.OUTPUTS)
+WINDOW_PER_WORKER = 4 # records submitted ahead by map() per worker thread (bounds memory for long iterables)
+PERSISTENT_CACHE_SIZE = 500 # entries of the temporary persistent cache of the stress check (evicting during the rounds)
+
+
+def calculate_record(record):
+    """ Raw values of all the outputs for the record of inputs. """
+    missing = [name for name in INPUTS if name not in record]
+    if missing:
+        raise ValueError(f"missing inputs: {', '.join(missing)}")
+
+    graph = ag.CalculationGraph() # graphs keep the state of one calculation, so they are not shared between threads
+    graph.update({name: float(record[name]) for name in INPUTS})
+
+    return {name: graph.values[name] for name in OUTPUTS}
+
+def public_functions():
+    """ {name: (function, names of its arguments)} of the public calculate_* and prepare_* functions of app_calc taking
+    the inputs (lambdas the maximal link utilization lu_max as well). """
+    functions = {}
+    for name, function in inspect.getmembers(ac, inspect.isfunction):
+        arguments = [argument for argument, parameter in inspect.signature(function).parameters.items()
+                     if parameter.default is parameter.empty]
+        if name.startswith(("calculate_", "prepare_")) and set(arguments) <= set(INPUTS) | {"lu_max"}:
+            functions[name] = (function, arguments)
+
+    return functions
+
+def calculate_public(record, functions=None):
+    """ Results of the public calculate_*/prepare_* functions of app_calc (public_functions() by default) for the record
+    of inputs, {function name: value} (app_graph.CalculationError instead of a value which can not be calculated). """
+    values = {name: float(record[name]) for name in INPUTS}
+    values["lu_max"] = ac.calculate_LU_max(values["capacity_L1"], values["nbr_max"])
+    results = {}
+    for name, (function, arguments) in (functions or public_functions()).items():
+        try:
+            results[name] = function(*(values[argument] for argument in arguments))
+        except (ArithmeticError, ValueError) as exception:
+            results[name] = ag.CalculationError(exception)
+
+    return results
+
+
+class ScenarioExecutor:
+    """ Calculates records of inputs in a thread pool (own one, or the given concurrent.futures executor). """
+
+    def __init__(self, max_workers=None, executor=None):
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4) # default of ThreadPoolExecutor
+        self._own_executor = executor is None
+        self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="netcalc") if executor is None else executor
+
+    def submit(self, record):
+        """ Future of the result of the record. """
+        return self.executor.submit(calculate_record, record)
+
+    def submit_all(self, records):
+        """ Futures of the results, in order of the records (use concurrent.futures.as_completed for completion order). """
+        return [self.submit(record) for record in records]
+
+    def map(self, records, timeout=None, window=None):
+        """ Iterator of the results in order of the records. At most window records (max_workers * WINDOW_PER_WORKER
+        by default) are submitted ahead, so the records can be a long (or endless) iterator. An exception of a record is
+        raised when its result is reached, the records submitted ahead are cancelled when the iteration ends early. """
+        window = window or self.max_workers * WINDOW_PER_WORKER
+        end_time = None if timeout is None else time.monotonic() + timeout
+        pending = collections.deque()
+        try:
+            for record in records:
+                pending.append(self.submit(record))
+                if len(pending) >= window:
+                    yield self._result(pending.popleft(), end_time)
+            while pending:
+                yield self._result(pending.popleft(), end_time)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _result(future, end_time):
+        return future.result(None if end_time is None else max(end_time - time.monotonic(), 0))
+
+    def shutdown(self, wait=True):
+        """ Shuts down the own thread pool (a given executor is left to its owner). """
+        if self._own_executor:
+            self.executor.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def random_records(count, seed=0):
+    """ Records of random inputs within the ranges of GUI fields (for checks and benchmarks). """
+    generator = random.Random(seed)
+    records = []
+    for _ in range(count):
+        capacity_L1 = generator.choice([0.1, 1, 10, 100, 500, 1000, 10000]) * generator.uniform(0.5, 2)
+        nbr_max = capacity_L1 * generator.uniform(0.05, 1)
+        records.append({
+            "capacity_L1": capacity_L1,
+            "mtu": float(generator.choice([46, 576, 1500, 1514])),
+            "ipheader": float(generator.choice([20, 40])),
+            "agg": float(generator.choice([1, 2, 10, 64, 256, 1000, 25000, 99999])),
+            "nbr_max": nbr_max,
+            "nbr_avg": nbr_max * generator.uniform(0.05, 1),
+            "prob": generator.choice([0.9, 0.95, 0.99]),
+            "rsa_req": float(generator.choice([0.5, 1, 10, 50, 100])),
+        })
+
+    return records
+
+def _same(value, other):
+    """ Values are identical (bit for bit, errors of the same type). """
+    if isinstance(value, ag.CalculationError) or isinstance(other, ag.CalculationError):
+        return type(value) is type(other) and type(value.exception) is type(other.exception)
+    if isinstance(value, float) and isinstance(other, float) and math.isnan(value) and math.isnan(other):
+        return True
+
+    return type(value) is type(other) and value == other
+
+def stress_check(records=None, workers=16, rounds=3, cache_size=64, persistent=True):
+    """ Calculates the records sequentially and then concurrently in rounds (cleared and small lambda cache, so the threads
+    miss, solve, store and evict the same lambdas at once; short switch interval for more interleaving under GIL).
+    With persistent, two more rounds call the public calculate_*/prepare_* functions of app_calc concurrently with
+    a temporary persistent cache (SQLite, small, so it evicts meanwhile): the first one fills it, the second one reads it;
+    both are compared with the sequential results of the functions without the persistent cache.
+    Returns the list of mismatches (round, record index, output or function, sequential value, concurrent value),
+    empty when identical. """
+    records = random_records(2000) if records is None else list(records)
+    original_maxsize = ac.lambda_cache.maxsize
+    original_interval = sys.getswitchinterval()
+    original_persistent_cache = ac.persistent_cache
+    mismatches = []
+
+    def compare(round_number, expected_results, results):
+        for index, (expected, result) in enumerate(zip(expected_results, results)):
+            for name in expected:
+                if not _same(expected[name], result[name]):
+                    mismatches.append((round_number, index, name, expected[name], result[name]))
+
+    try:
+        ac.lambda_cache.clear()
+        ac.persistent_cache = None # sequential results are solved
+        sequential = [calculate_record(record) for record in records]
+        functions = public_functions()
+        sequential_public = [calculate_public(record, functions) for record in records] if persistent else []
+
+        ac.lambda_cache.resize(cache_size)
+        sys.setswitchinterval(1e-6)
+        with ScenarioExecutor(workers) as executor:
+            for round_number in range(rounds):
+                ac.lambda_cache.clear()
+                if round_number % 2 == 0: # ordered iterator
+                    results = list(executor.map(records))
+                else: # futures collected in order of completion
+                    futures = executor.submit_all(records)
+                    indexes = {future: index for index, future in enumerate(futures)}
+                    results = [None] * len(records)
+                    for future in as_completed(futures):
+                        results[indexes[future]] = future.result()
+                compare(round_number, sequential, results)
+
+            if persistent:
+                with tempfile.TemporaryDirectory() as directory:
+                    cache = ac.enable_persistent_cache(os.path.join(directory, "cache.sqlite"), PERSISTENT_CACHE_SIZE)
+                    try:
+                        for round_number in range(rounds, rounds + 2): # filling and reading the persistent cache
+                            ac.lambda_cache.clear()
+                            results = list(executor.executor.map(lambda record: calculate_public(record, functions), records))
+                            compare(round_number, sequential_public, results)
+                    finally:
+                        ac.persistent_cache = None
+                        cache.close()
+    finally:
+        sys.setswitchinterval(original_interval)
+        ac.persistent_cache = original_persistent_cache
+        ac.lambda_cache.resize(original_maxsize)
+        ac.lambda_cache.clear()
+
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress check of concurrent calculations (results identical with sequential ones).")
+    parser.add_argument("-n", "--records", type=int, default=2000, help="number of random records (default 2000)")
+    parser.add_argument("-w", "--workers", type=int, default=16, help="number of threads (default 16)")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="number of concurrent rounds (default 3)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random records")
+    parser.add_argument("--no-persistent", action="store_true", help="without the rounds of app_calc functions with the persistent cache")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    mismatches = stress_check(random_records(args.records, args.seed), args.workers, args.rounds, persistent=not args.no_persistent)
+    for round_number, index, name, expected, result in mismatches[:20]:
+        print(f"round {round_number}, record {index}, {name}: sequential {expected!r}, concurrent {result!r}")
+    print(f"{args.records} records x {args.rounds + (0 if args.no_persistent else 2)} rounds, {args.workers} threads: "
+          f"{len(mismatches)} mismatches ({time.perf_counter() - start:.1f} s)")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Dependency graph of the calculations: inputs -> intermediate values -> outputs.
+
+Every node is a function of other nodes (app_calc.FORMULAS: derive_* formulas and calculate_lambda_*). When some inputs change,
+only the nodes depending on them are evaluated, each exactly once and in topological order, and the propagation stops
+at nodes whose value did not change (e.g. another capacity giving the same estimated aggregation does not solve lambda again).
+The results are identical with the calculate_* functions of app_calc (same formulas and operation order).
+A graph built with coarser precision of lambdas (build_nodes(decimals)) gives quick preliminary results. Updated within
+app_calc.cached_only(), the nodes needing lambdas which are not in the tables or caches stay pending (value None) till
+the next update.
+"""
+
+import functools
+
+import app_calc as ac
+
+INPUTS = ac.INPUTS
+
+
+def build_nodes(decimals=None):
+    """ Nodes of the graph (app_calc.FORMULAS), lambdas are solved with the given precision (decimals of
+    app_calc.PRECISION_TIERS, full by default). Node: (function, names of the nodes used as its arguments). """
+    nodes = dict(ac.FORMULAS)
+    for name in ac.LAMBDAS:
+        function, dependencies = nodes[name]
+        nodes[name] = (functools.partial(function, decimals=decimals), dependencies)
+    
+    return nodes
+
+NODES = build_nodes()
+
+# lambda nodes searched from their previous value (warm start, small input changes cost only a few cdf evaluations),
+# lambda of constant k (calculate_lambda_simple) is inverted directly and does not need it
+WARM_STARTED_NODES = ("lam_div", "lam_RSA_UF")
+
+# outputs and their presentation in GUI (same as prepare_* functions of app_calc)
+OUTPUTS = {name: functools.partial(ac.prepare_output, name) for name in ac.OUTPUTS}
+
+
+class CalculationError:
+    """ Value of a node which could not be calculated (e.g. division by zero lambda), propagated to dependent nodes. """
+
+    def __init__(self, exception):
+        self.exception = exception
+
+    def __repr__(self):
+        return f"CalculationError({self.exception!r})"
+
+
+def topological_order(nodes=NODES):
+    """ Names of the nodes ordered so that every node follows all the nodes it depends on. """
+    order = []
+    visited = set()
+
+    def visit(name):
+        if name in visited or name not in nodes:
+            return # inputs are not nodes
+        visited.add(name)
+        for dependency in nodes[name][1]:
+            visit(dependency)
+        order.append(name)
+
+    for name in nodes:
+        visit(name)
+
+    return order
+
+
+class CalculationGraph:
+    """ Current values of all the nodes, recalculated incrementally by update() (not thread safe, one graph per thread). """
+
+    def __init__(self, nodes=NODES, outputs=OUTPUTS, warm_started=WARM_STARTED_NODES):
+        self.nodes = nodes
+        self.outputs = outputs
+        self.warm_started = warm_started
+        self.order = topological_order(nodes)
+        self.values = {}
+        self.pending = set() # nodes with value None: lambda not solved within app_calc.cached_only() and their dependents
+        self.starts = {} # last solved values of the warm started nodes
+        self.evaluations = {name: 0 for name in self.order} # number of evaluations of each node (for diagnostics)
+
+    def update(self, inputs):
+        """ Sets the input values (dict, only changed ones are enough) and evaluates each affected node once,
+        pending nodes are evaluated again. Returns {output: value} of the outputs whose value changed. """
+        changed = set()
+        for name, value in inputs.items():
+            if name not in self.values or self.values[name] != value:
+                self.values[name] = value
+                changed.add(name)
+
+        for name in self.order:
+            function, dependencies = self.nodes[name]
+            if name in self.values and name not in self.pending and changed.isdisjoint(dependencies):
+                continue # not affected
+            if any(dependency not in self.values for dependency in dependencies):
+                continue # some input not set yet
+
+            arguments = [self.values[dependency] for dependency in dependencies]
+            errors = [argument for argument in arguments if isinstance(argument, CalculationError)]
+            if errors:
+                value = errors[0]
+            elif not self.pending.isdisjoint(dependencies):
+                value = None # waits for the pending lambda
+            else:
+                self.evaluations[name] += 1
+                warm_start = {"start": self.starts[name]} if name in self.starts else {}
+                try:
+                    value = function(*arguments, **warm_start)
+                except (ArithmeticError, ValueError) as exception:
+                    value = CalculationError(exception)
+                if name in self.warm_started and isinstance(value, float):
+                    self.starts[name] = value
+
+            if value is None:
+                self.pending.add(name)
+            else:
+                self.pending.discard(name)
+            if name not in self.values or self.values[name] != value:
+                self.values[name] = value
+                changed.add(name)
+
+        return {name: self.values[name] for name in self.outputs if name in changed}
+
+    def pending_outputs(self):
+        """ Names of the outputs waiting for lambdas not solved within app_calc.cached_only(). """
+        return [name for name in self.outputs if name in self.pending]
+
+    def provisional_outputs(self, decimals, names=None):
+        """ Names of the outputs (of names, all by default) whose presentation may differ with the full precision
+        lambdas. Lambda solved on the grid of decimals is the full precision one floored, which lies between it and
+        its next grid point; the outputs are monotonic in their lambda, so the output evaluated with both bounds tells
+        whether its relative error can change the shown digits (e.g. large capacity divided by small lambda). """
+        if decimals is None or decimals >= ac.LAMBDA_DECIMALS:
+            return []
+        step = 10**-decimals
+        provisional = []
+        for name in self.outputs if names is None else names:
+            function, dependencies = self.nodes[name]
+            value = self.values.get(name)
+            if value is None or isinstance(value, CalculationError) or not set(dependencies).intersection(ac.LAMBDAS):
+                continue # nothing shown or exact
+            arguments = [self.values[dependency] + step if dependency in ac.LAMBDAS else self.values[dependency]
+                         for dependency in dependencies]
+            try:
+                bound = function(*arguments)
+            except (ArithmeticError, ValueError):
+                bound = None
+            if bound is None or self.format(name, bound) != self.format(name, value):
+                provisional.append(name)
+
+        return provisional
+
+    def dependent_outputs(self, inputs):
+        """ Names of the outputs depending (directly or through intermediate values) on any of the inputs. """
+        affected = set(inputs)
+        for name in self.order:
+            if not affected.isdisjoint(self.nodes[name][1]):
+                affected.add(name)
+
+        return [name for name in self.outputs if name in affected]
+
+    def format(self, name, value):
+        """ Output value for presentation in GUI. """
+        if isinstance(value, CalculationError):
+            return "–"
+
+        return self.outputs[name](value)
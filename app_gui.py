@@ -356,6 +356,9 @@ class Ui_AppMainWindow(object):
         self.sdr_req.setSingleStep(0.1)
         self.sdr_req.setProperty("value", 100.0)
         self.sdr_req.setObjectName("sdr_req")
+        self.goal_seek = QtWidgets.QPushButton(parent=self.section_E)
+        self.goal_seek.setGeometry(QtCore.QRect(380, 38, 130, 24))
+        self.goal_seek.setObjectName("goal_seek")
         self.E2_help = QtWidgets.QPushButton(parent=self.section_E)
         self.E2_help.setGeometry(QtCore.QRect(620, 83, 41, 24))
         self.E2_help.setToolTipDuration(600000)
@@ -412,7 +415,8 @@ class Ui_AppMainWindow(object):
         AppMainWindow.setTabOrder(self.probability, self.out_sdr_noUF)
         AppMainWindow.setTabOrder(self.out_sdr_noUF, self.out_sdr_UF)
         AppMainWindow.setTabOrder(self.out_sdr_UF, self.sdr_req)
-        AppMainWindow.setTabOrder(self.sdr_req, self.out_ntp_noUF)
+        AppMainWindow.setTabOrder(self.sdr_req, self.goal_seek)
+        AppMainWindow.setTabOrder(self.goal_seek, self.out_ntp_noUF)
         AppMainWindow.setTabOrder(self.out_ntp_noUF, self.out_ntp_UF)
         AppMainWindow.setTabOrder(self.out_ntp_UF, self.out_perf_noUF)
         AppMainWindow.setTabOrder(self.out_perf_noUF, self.out_perf_UF)
@@ -493,6 +497,9 @@ class Ui_AppMainWindow(object):
         self.out_ntp_l.setText(_translate("AppMainWindow", "E.2 Průměrný počet přípojek (NTP)"))
         self.E_help.setToolTip(_translate("AppMainWindow", "<html><head/><body><p><span style=\" font-weight:700;\">Část E</span> kalkulačky zahrnuje nepovinné vstupní parametry, které ovšem umožňují provést analýzu dopadu požadované hodnoty rychlosti SDR v místě disponibilní/aktivní přípojky, tedy místě koncového bodu sítě (NTP), na vlastnosti identifikovaného úzkého hrdla síťové infrastruktury.</p></body></html>"))
         self.E1_help.setToolTip(_translate("AppMainWindow", "<html><head/><body><p><span style=\" font-weight:700;\">VSTUP 8:</span> Vstupní hodnota průměrné SDR, která má být zohledněna s ohledem na vlastnosti identifikovaného úzkého hrdla síťové infrastruktury v rámci Poissonova procesu pro potřeby analýzy dopadu agregace. V případě, že posuzované přípojky vykazují různou hodnotu běžně dostupné rychlosti (efektivní rychlosti), doporučuje se použít váženého průměru.</p></body></html>"))
+        self.goal_seek.setToolTip(_translate("AppMainWindow", "Největší agregace, při které SDR ještě dosahuje požadované hodnoty (Ctrl+G)"))
+        self.goal_seek.setText(_translate("AppMainWindow", "Max. agregace…"))
+        self.goal_seek.setShortcut(_translate("AppMainWindow", "Ctrl+G"))
         self.E2_help.setToolTip(_translate("AppMainWindow", "<html><head/><body><p><span style=\" font-weight:700;\">Výstup 2:</span> Průměrný počet koncových bodů sítě (NTP) bez UF charakterizuje možné pokrytí disponibilních přípojek posuzovanou infrastrukturou s ohledem na požadovanou hodnotu SDR (položka E.1) a identifikovanou kapacitu sítě v místě úzkého hrdla síťové infrastruktury (A.1) se současným předpokladem jejího plného vytížení, zatímco výsledná hodnota průměrného počtu koncových bodů sítě (NTP) s UF charakterizuje aktuální možnost pokrytí aktivních přípojek s ohledem na dostupnou kapacitu sítě (položka A.1) a typické chování koncových uživatelů dle monitoringu síťového provozu (položka B.3) v dané lokalitě.</p></body></html>"))
         self.E3_help.setToolTip(_translate("AppMainWindow", "<html><head/><body><p><span style=\" font-weight:700;\">Výstup 3:</span> Výsledná průměrná hodnota P<span style=\" vertical-align:sub;\">SDR</span> (bez UF) popisuje dopad výkonosti posuzované infrastruktury v místě NTP (disponibilních přípojek) za předpokladu plného vytížení kapacity sítě (A.1) pro požadovanou průměrnou hodnotou SDR (položka E.1), zatímco výsledná průměrná hodnota P<span style=\" vertical-align:sub;\">SDR</span> (s UF) popisuje aktuální dopad výkonosti síťové infrastruktury v místě NTP (aktivních přípojek) s ohledem na dostupnou kapacitu sítě (položka A.1) a chování koncových uživatelů (položka B.3) dle monitoringu síťového provozu pro požadovanou průměrnou hodnotou SDR (E.1).</p></body></html>"))
         self.out_bandwidth_min_l.setText(_translate("AppMainWindow", "E.4 Potřebná šířka pásma (L3) úzkého hrdla"))
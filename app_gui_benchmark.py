@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark of the GUI responsiveness: the real main window (app.CalculatorMainWindow) on the offscreen Qt
+platform (no display needed, runs on CI machines) driven by scripted input sequences - typing into agg, switching
+probability and IP header, scrolling capacity by mouse wheel.
+
+Every key press or wheel notch is an event. Its latency is the time from sending the event to the window to the end of
+the first update of the output fields with final (full precision) results of inputs submitted after the event, i.e.
+the time the user waits for the correct values (typing pause, background calculation and GUI slots included).
+The first update (possibly preliminary coarse results) is reported as well. Calls of the window slots (input changes,
+recalculations, results shown or dropped, refreshed output fields) are counted for each step of the script.
+
+  python app_gui_benchmark.py                          (report)
+  python app_gui_benchmark.py --repeat 3 --cold        (script three times, empty lambda cache before every step)
+  python app_gui_benchmark.py --json gui-latency.json  (report stored in JSON file as well)
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # before the creation of QApplication
+
+from PyQt6.QtCore import QPoint, QPointF, Qt
+from PyQt6.QtGui import QWheelEvent
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QApplication
+
+import app
+import app_calc as ac
+import app_worker as aw
+
+FORMAT_VERSION = 1
+TYPING_DELAY = 120 # [ms] between keystrokes of typed values (quick typist)
+SCROLL_INTERVAL = 40 # [ms] between wheel notches
+STEP_PAUSE = 100 # [ms] idle time after a settled step before the next one
+SETTLE_TIMEOUT = 30.0 # [s] events without final results till then are reported as timed out
+PERCENTILES = (50, 90)
+# counted slots of the window (columns of the report, per event)
+COUNTS = ("input_changed", "flush_inputs", "submits", "computing_state", "results_shown", "results_dropped", "fields_refreshed")
+
+# script: (step name, input, action, argument); actions: "type" - select all and type the text, "key" - press the keys
+# (combo boxes switch items by arrow keys), "scroll" - wheel notches (positive up); the values keep capacity >= NBRs
+SCRIPT = (
+    ("type agg 2500", "agg", "type", "2500"),
+    ("type agg 64", "agg", "type", "64"),
+    ("type agg 99999", "agg", "type", "99999"),
+    ("switch probability", "probability", "key", (Qt.Key.Key_Down,)),
+    ("switch probability back", "probability", "key", (Qt.Key.Key_Up,)),
+    ("switch ipheader", "ipheader", "key", (Qt.Key.Key_Down,)),
+    ("switch ipheader back", "ipheader", "key", (Qt.Key.Key_Up,)),
+    ("scroll capacity up 10x", "capacity", "scroll", 10),
+    ("scroll capacity down 10x", "capacity", "scroll", -10),
+    ("type agg 256", "agg", "type", "256"),
+)
+
+
+class LatencyProbe:
+    """ Events sent to the window and their resolution by the shown results, counts of the slot calls. """
+
+    def __init__(self):
+        self.events = [] # [sent, first update, final update] ([s] perf_counter, None till resolved)
+        self.submissions = {} # generation: time of submitting
+        self.counts = collections.Counter()
+
+    def event(self):
+        self.events.append([time.perf_counter(), None, None])
+
+    def unresolved(self):
+        return [event for event in self.events if event[2] is None]
+
+    def submitted(self, generation):
+        self.counts["submits"] += 1
+        self.submissions[generation] = time.perf_counter()
+
+    def results(self, generation, final, shown, refreshed):
+        """ Results were handled by the window (shown: of the current generation, refreshed: changed fields). """
+        now = time.perf_counter()
+        self.counts["results_shown" if shown else "results_dropped"] += 1
+        self.counts["fields_refreshed"] += refreshed
+        if not shown:
+            return
+        submitted = self.submissions[generation]
+        for event in self.unresolved():
+            if event[0] <= submitted: # the inputs of the results include the change made by the event
+                event[1] = event[1] or now
+                if final:
+                    event[2] = now
+
+
+class InstrumentedWindow(app.CalculatorMainWindow):
+    """ Main window reporting its slot calls to the probe (signals are connected to the overridden methods). """
+
+    def __init__(self, probe):
+        self.probe = probe
+        super().__init__()
+
+    def input_changed(self, name, *signal_args):
+        self.probe.counts["input_changed"] += 1
+        super().input_changed(name, *signal_args)
+
+    def flush_inputs(self):
+        self.probe.counts["flush_inputs"] += 1
+        super().flush_inputs()
+
+    def recalculate(self, changed_inputs):
+        super().recalculate(changed_inputs)
+        self.probe.submitted(self.worker.generation)
+
+    def show_computing_state(self):
+        self.probe.counts["computing_state"] += 1
+        super().show_computing_state()
+
+    def show_results(self, generation, outputs, final, provisional):
+        shown = self.worker.is_current(generation)
+        texts = dict(self.output_texts)
+        super().show_results(generation, outputs, final, provisional)
+        refreshed = sum(texts.get(name) != text for name, text in self.output_texts.items())
+        self.probe.results(generation, final, shown, refreshed)
+
+
+def _send_events(window, probe, field_name, action, argument):
+    """ Sends the events of the script step to the input field (each one recorded in the probe). """
+    field = getattr(window.ui, field_name)
+    field.setFocus()
+    if action == "type":
+        QTest.keyClick(field, Qt.Key.Key_A, Qt.KeyboardModifier.ControlModifier) # select all, typed text replaces it
+        for index, character in enumerate(argument):
+            if index:
+                QTest.qWait(TYPING_DELAY)
+            probe.event()
+            QTest.keyClick(field, character)
+    elif action == "key":
+        for index, key in enumerate(argument):
+            if index:
+                QTest.qWait(TYPING_DELAY)
+            probe.event()
+            QTest.keyClick(field, key)
+    elif action == "scroll":
+        position = QPointF(field.rect().center())
+        for index in range(abs(argument)):
+            if index:
+                QTest.qWait(SCROLL_INTERVAL)
+            probe.event()
+            QApplication.sendEvent(field, QWheelEvent(position, QPointF(field.mapToGlobal(position)), QPoint(),
+                                                      QPoint(0, 120 if argument > 0 else -120), Qt.MouseButton.NoButton,
+                                                      Qt.KeyboardModifier.NoModifier, Qt.ScrollPhase.NoScrollPhase, False))
+    else:
+        raise ValueError(f"unknown action {action}")
+
+def _settle(probe, timeout=SETTLE_TIMEOUT):
+    """ Processes the events of the application till all the recorded events are resolved, False on timeout. """
+    deadline = time.perf_counter() + timeout
+    while probe.unresolved():
+        if time.perf_counter() > deadline:
+            return False
+        QTest.qWait(2)
+
+    return True
+
+def _step_result(name, events, counts, settled):
+    finals = [(event[2] - event[0]) * 1000 for event in events if event[2] is not None]
+    firsts = [(event[1] - event[0]) * 1000 for event in events if event[1] is not None]
+
+    return {"step": name, "events": len(events), "timed_out": len(events) - len(finals), "settled": settled,
+            "final_ms": finals, "first_ms": firsts, "counts": {slot: counts[slot] for slot in COUNTS}}
+
+def run(script=SCRIPT, repeat=1, cold=False):
+    """ Runs the script (repeat times) in the instrumented window, returns the report (dict). """
+    qapp = QApplication.instance() or QApplication(sys.argv[:1])
+    probe = LatencyProbe()
+    window = InstrumentedWindow(probe)
+    steps = []
+    try:
+        probe.event() # initial calculation (imports the numerical libraries)
+        window.show()
+        settled = _settle(probe)
+        steps.append(_step_result("initial values", probe.events, probe.counts, settled))
+        for _ in range(repeat):
+            for name, field_name, action, argument in script:
+                QTest.qWait(STEP_PAUSE)
+                if cold:
+                    ac.lambda_cache.clear() # (worker is idle between the steps)
+                probe.events, probe.counts = [], collections.Counter()
+                _send_events(window, probe, field_name, action, argument)
+                settled = _settle(probe)
+                steps.append(_step_result(name, probe.events, probe.counts, settled))
+    finally:
+        window.close()
+        qapp.processEvents()
+
+    return {
+        "format_version": FORMAT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qt_platform": qapp.platformName(),
+        "algorithm_version": ac.ALGORITHM_VERSION,
+        "settings": {"input_quiet_period": app.INPUT_QUIET_PERIOD, "typing_delay": TYPING_DELAY,
+                     "scroll_interval": SCROLL_INTERVAL, "tiers": list(aw.PROGRESSIVE_TIERS), "repeat": repeat, "cold": cold},
+        "steps": steps,
+    }
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[min(len(values) * percentile // 100, len(values) - 1)] if values else float("nan")
+
+def summarize(steps):
+    """ Results of the steps with the same name (repeated script) merged, in the order of the script. """
+    merged = {}
+    for step in steps:
+        total = merged.setdefault(step["step"], {"step": step["step"], "events": 0, "timed_out": 0, "final_ms": [],
+                                                  "first_ms": [], "counts": collections.Counter()})
+        for key in ("events", "timed_out"):
+            total[key] += step[key]
+        total["final_ms"] += step["final_ms"]
+        total["first_ms"] += step["first_ms"]
+        total["counts"].update(step["counts"])
+
+    return list(merged.values())
+
+def format_report(report):
+    """ Lines of the report table: latencies [ms] of the events and slot calls per event of the steps. """
+    lines = [f"Qt platform {report['qt_platform']}, input quiet period {report['settings']['input_quiet_period']} ms, "
+             f"typing delay {report['settings']['typing_delay']} ms, tiers {'+'.join(report['settings']['tiers'])}, "
+             f"repeat {report['settings']['repeat']}{', cold lambda cache' if report['settings']['cold'] else ''}",
+             f"{'step':>26} {'events':>6} " + " ".join(f"{f'final p{p}':>9}" for p in PERCENTILES) +
+             f" {'final max':>9} {'first p50':>9}  slot calls per event: " + " ".join(COUNTS)]
+    for step in summarize(report["steps"]):
+        events = step["events"] or 1
+        line = f"{step['step']:>26} {step['events']:>6} " + \
+               " ".join(f"{_percentile(step['final_ms'], p):>9.1f}" for p in PERCENTILES) + \
+               f" {max(step['final_ms'], default=float('nan')):>9.1f} {_percentile(step['first_ms'], 50):>9.1f}  " + \
+               " ".join(f"{step['counts'][name] / events:.2f}" for name in COUNTS)
+        if step["timed_out"]:
+            line += f"  TIMED OUT {step['timed_out']}"
+        lines.append(line)
+    finals = [latency for step in report["steps"][1:] for latency in step["final_ms"]] # (without the initial values)
+    lines.append(f"all scripted events: {len(finals)}, final update p50 {_percentile(finals, 50):.1f} ms, "
+                 f"p90 {_percentile(finals, 90):.1f} ms, max {max(finals, default=float('nan')):.1f} ms")
+
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Input-to-display latency of the GUI driven by scripted inputs on the offscreen Qt platform.")
+    parser.add_argument("--repeat", type=int, default=1, help="number of runs of the script (default 1)")
+    parser.add_argument("--cold", action="store_true", help="empty lambda cache before every step")
+    parser.add_argument("--no-tables", action="store_true", help="lambdas solved, not read from the precomputed tables")
+    parser.add_argument("--quiet-period", type=int, metavar="MS",
+                        help=f"typing pause before recalculation (default {app.INPUT_QUIET_PERIOD} ms of the app)")
+    parser.add_argument("--json", metavar="FILE", help="store the report in JSON file")
+    args = parser.parse_args(argv)
+
+    if args.quiet_period is not None:
+        app.INPUT_QUIET_PERIOD = args.quiet_period # (read by the window)
+    if args.no_tables:
+        ac.load_lambda_tables(False)
+    report = run(repeat=args.repeat, cold=args.cold)
+    print("\n".join(format_report(report)))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=1)
+        print(f"saved to {args.json}")
+
+    return 1 if any(step["timed_out"] for step in report["steps"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""
+Local HTTP/JSON calculation service (asyncio, standard library only, no GUI libraries are needed).
+
+  POST /calculate        one record {"capacity_L1": ..., "mtu": ..., ...} -> the record extended by all the outputs
+  POST /calculate/bulk   [record, ...] or {"records": [...]} -> {"results": [...]} in order of the records
+  GET  /stats            latency percentiles of the endpoints, queue depth and batching counters
+  GET  /health           {"status": "ok"}
+
+Records have the inputs of app_graph.INPUTS (prob as a fraction, 0.9 = 90 %), other keys (e.g. "id") are copied to the
+result. Outputs are raw values, null where they can not be calculated (e.g. division by zero). Optional "precision" field
+(of the record for /calculate, of {"records": [...], "precision": ...} for /calculate/bulk) selects the precision tier of
+lambdas (app_calc.PRECISION_TIERS: "coarse" quicker and approximate, "full" by default).
+
+Records of requests arriving while a batch is calculated (or within BATCH_WINDOW after the first one) are grouped into one
+vectorized calculation (app_batch.calculate_all, each distinct lambda is solved once and cached). The calculation runs in
+a background thread, so the event loop keeps accepting and answering requests (e.g. /stats) meanwhile; with --workers the
+lambdas are solved by a process pool.
+
+  python app_server.py --port 8080
+  curl -d '{"capacity_L1": 1000, "mtu": 1500, "ipheader": 20, "agg": 256, "nbr_max": 500, "nbr_avg": 100, "prob": 0.9, "rsa_req": 10}' localhost:8080/calculate
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import app_batch as ab
+import app_calc as ac
+import app_cli
+import app_graph as ag
+
+INPUTS = ag.INPUTS
+BATCH_WINDOW = 0.002 # [s] waiting for more requests after the first one of a batch
+BATCH_MAX_ROWS = 50000 # records calculated at once at most (bigger bulk requests make a batch alone)
+BULK_MAX_RECORDS = 100000
+MAX_BODY_SIZE = 64 * 1024 * 1024 # [B]
+LATENCY_SAMPLES = 10000 # last requests of each endpoint used for the percentiles
+PERCENTILES = (50, 90, 95, 99)
+
+
+class RequestError(Exception):
+    """ Invalid request, answered with the status and message. """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def normalize_records(records):
+    """ Copies of the records with the inputs converted to floats, RequestError for invalid ones
+    (checked before batching, so an invalid record does not fail the requests batched with it). """
+    rows = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"record {index}: JSON object expected")
+        row = dict(record)
+        for name in INPUTS:
+            if name not in record:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"record {index}: missing input {name}")
+            try:
+                row[name] = float(record[name])
+            except (TypeError, ValueError):
+                row[name] = math.nan
+            if not math.isfinite(row[name]):
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"record {index}: invalid value of {name}: {record[name]!r}")
+        rows.append(row)
+
+    return rows
+
+def request_precision(value):
+    """ Name of the precision tier of lambdas given by the request (None = full), RequestError for unknown ones. """
+    if value is None:
+        return "full"
+    if value not in ac.PRECISION_TIERS:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"invalid precision {value!r}, one of: {', '.join(ac.PRECISION_TIERS)}")
+
+    return value
+
+
+class LatencyStats:
+    """ Request counter and latency percentiles of the last LATENCY_SAMPLES requests. """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self._samples = collections.deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, duration, error=False):
+        self.count += 1
+        self.errors += error
+        self._samples.append(duration)
+
+    def info(self):
+        samples = sorted(self._samples)
+        latency = {}
+        if samples:
+            for percentile in PERCENTILES:
+                latency[f"p{percentile}"] = samples[min(len(samples) * percentile // 100, len(samples) - 1)] * 1000
+            latency["max"] = samples[-1] * 1000
+
+        return {"count": self.count, "errors": self.errors, "latency_ms": latency}
+
+
+class MicroBatcher:
+    """ Groups records of concurrent requests into batches calculated one after another in a background thread.
+    A batch starts BATCH_WINDOW after the first waiting record, when max_rows records wait, or right after the previous
+    batch (records arriving during a calculation make the next batch). Records of one batch have the same precision tier,
+    the others wait for the next one. """
+
+    def __init__(self, window=BATCH_WINDOW, max_rows=BATCH_MAX_ROWS, executor=None):
+        self.window = window
+        self.max_rows = max_rows
+        self.executor = executor # process pool solving lambdas (app_batch), None = in the calculation thread
+        self._thread = ThreadPoolExecutor(1, thread_name_prefix="netcalc-batch")
+        self._pending = [] # (rows, future, precision)
+        self._timer = None
+        self._running = False
+        self._task = None
+        self.queue_depth = 0 # records waiting for a batch
+        self.max_queue_depth = 0
+        self.in_flight = 0 # records being calculated
+        self.batches = 0
+        self.batched_rows = 0
+        self.calculation_time = 0.0
+
+    async def calculate(self, rows, precision="full"):
+        """ Rows extended by the outputs (rows must be normalized), lambdas of the precision tier (name). """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((rows, future, precision))
+        self.queue_depth += len(rows)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        if not self._running:
+            if self.queue_depth >= self.max_rows or self.window <= 0:
+                self._start_batch()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._start_batch)
+
+        return await future
+
+    def _start_batch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._running or not self._pending:
+            return
+
+        precision = self._pending[0][2] # precision tier of the batch (of the first waiting records)
+        batch, waiting, count, full = [], [], 0, False
+        for rows, future, entry_precision in self._pending:
+            full = full or (entry_precision == precision and bool(batch) and count + len(rows) > self.max_rows)
+            if entry_precision != precision or full: # (records after the first not fitting one wait as well, in order)
+                waiting.append((rows, future, entry_precision))
+                continue
+            batch.append((rows, future))
+            count += len(rows)
+        self._pending = waiting
+        self.queue_depth -= count
+        self._running = True
+        self._task = asyncio.get_running_loop().create_task(self._run(batch, count, precision)) # reference keeps the task alive
+
+    async def _run(self, batch, count, precision):
+        rows = [row for batch_rows, _ in batch for row in batch_rows]
+        self.in_flight = count
+        start = time.perf_counter()
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._thread, self._calculate, rows, precision)
+        except Exception as exception:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exception)
+        else:
+            offset = 0
+            for batch_rows, future in batch:
+                if not future.done(): # cancelled when the client disconnected
+                    future.set_result(results[offset:offset + len(batch_rows)])
+                offset += len(batch_rows)
+        finally:
+            self.calculation_time += time.perf_counter() - start
+            self.batches += 1
+            self.batched_rows += count
+            self.in_flight = 0
+            self._running = False
+
+        if self._pending: # arrived during the calculation
+            self._start_batch()
+
+    def _calculate(self, rows, precision):
+        return app_cli.calculate_chunk(rows, {}, first_row_number=1, executor=self.executor, precision=precision)
+
+    def info(self):
+        return {"queue_depth": self.queue_depth, "max_queue_depth": self.max_queue_depth, "in_flight": self.in_flight,
+                "batches": self.batches, "mean_batch_size": self.batched_rows / self.batches if self.batches else 0.0,
+                "calculation_time": self.calculation_time}
+
+    def shutdown(self):
+        self._thread.shutdown()
+
+
+class CalculationServer:
+    """ HTTP/1.1 server (keep-alive, Content-Length bodies) with the JSON endpoints. """
+
+    def __init__(self, batcher=None):
+        self.batcher = batcher or MicroBatcher()
+        self.routes = {
+            "/calculate": ("POST", self.calculate),
+            "/calculate/bulk": ("POST", self.calculate_bulk),
+            "/stats": ("GET", self.stats),
+            "/health": ("GET", self.health),
+        }
+        self.latency = {path: LatencyStats() for path in self.routes}
+        self.connections = 0
+        self.started = time.time()
+
+    async def calculate(self, body):
+        record = _parse_json(body)
+        precision = None
+        if isinstance(record, dict) and "precision" in record:
+            record = dict(record)
+            precision = record.pop("precision")
+        return (await self.batcher.calculate(normalize_records([record]), request_precision(precision)))[0]
+
+    async def calculate_bulk(self, body):
+        records = _parse_json(body)
+        precision = None
+        if isinstance(records, dict):
+            records, precision = records.get("records"), records.get("precision")
+        if not isinstance(records, list):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "JSON array of records or {\"records\": [...]} expected")
+        if len(records) > BULK_MAX_RECORDS:
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"at most {BULK_MAX_RECORDS} records in one request")
+
+        precision = request_precision(precision)
+
+        return {"results": await self.batcher.calculate(normalize_records(records), precision) if records else []}
+
+    async def stats(self, body):
+        return {"uptime": time.time() - self.started, "connections": self.connections,
+                "endpoints": {path: stats.info() for path, stats in self.latency.items()}, **self.batcher.info()}
+
+    async def health(self, body):
+        return {"status": "ok"}
+
+    async def dispatch(self, method, target, body):
+        """ Status and JSON payload of the response. """
+        path = target.partition("?")[0]
+        if path not in self.routes:
+            return HTTPStatus.NOT_FOUND, {"error": f"unknown path {path}"}
+        route_method, handler = self.routes[path]
+        if method != route_method:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"use {route_method}"}
+
+        start = time.perf_counter()
+        try:
+            status, payload = HTTPStatus.OK, await handler(body)
+        except RequestError as exception:
+            status, payload = exception.status, {"error": str(exception)}
+        except Exception as exception: # unexpected failure of the calculation
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exception).__name__}: {exception}"}
+        self.latency[path].add(time.perf_counter() - start, error=status != HTTPStatus.OK)
+
+        return status, payload
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break # closed by the client
+                except asyncio.LimitOverrunError:
+                    await _respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, {"error": "headers too large"}, False)
+                    break
+
+                try:
+                    method, target, version, headers = _parse_head(head)
+                except ValueError:
+                    await _respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request"}, False)
+                    break
+                if "transfer-encoding" in headers:
+                    await _respond(writer, HTTPStatus.NOT_IMPLEMENTED, {"error": "use Content-Length"}, False)
+                    break
+                length = headers.get("content-length", "0")
+                if not length.isdigit() or int(length) > MAX_BODY_SIZE:
+                    await _respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "invalid or too large body"}, False)
+                    break
+                length = int(length)
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                status, payload = await self.dispatch(method, target, body)
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # client gone
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080, ready=None):
+        """ Runs the server until cancelled, ready(address) is called when it listens. """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname())
+        async with server:
+            await server.serve_forever()
+
+
+def _parse_json(body):
+    try:
+        return json.loads(body)
+    except ValueError as exception:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {exception}") from None
+
+def _parse_head(head):
+    """ (method, target, version, headers with lowercase names) of the request head, ValueError when malformed. """
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ")
+    if not version.startswith("HTTP/"):
+        raise ValueError(version)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, separator, value = line.partition(":")
+            if not separator:
+                raise ValueError(line)
+            headers[name.strip().lower()] = value.strip()
+
+    return method, target, version, headers
+
+async def _respond(writer, status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service calculating the net capacity impact.")
+    parser.add_argument("--host", default="127.0.0.1", help="listening address (default 127.0.0.1)")
+    parser.add_argument("-p", "--port", type=int, default=8080, help="listening port (default 8080)")
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW * 1000,
+                        help=f"[ms] waiting for more requests to batch (default {BATCH_WINDOW * 1000:g}, 0 = no waiting)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_MAX_ROWS, help=f"records calculated at once at most (default {BATCH_MAX_ROWS})")
+    parser.add_argument("-w", "--workers", type=int, help="number of processes solving distinct lambdas in parallel (0 = all CPUs)")
+    args = parser.parse_args(argv)
+
+    executor = ab.pool_executor(args.workers or None) if args.workers is not None else None
+    batcher = MicroBatcher(args.batch_window / 1000, max(args.batch_size, 1), executor)
+    server = CalculationServer(batcher)
+    try:
+        asyncio.run(server.serve(args.host, args.port, ready=lambda address: print(f"listening on {address[0]}:{address[1]}", file=sys.stderr)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batcher.shutdown()
+        if executor is not None:
+            executor.shutdown()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar store of batch results: directory with one NumPy .npy file per column (inputs and outputs, float64) and
+a small JSON manifest (columns, number of rows, runs which appended them with their sources and settings).
+
+Columns are opened memory-mapped (np.load(..., mmap_mode="r") works as well), so the analysis of a million-row
+inventory reads only the pages it touches. Runs append rows to the existing columns: the .npy header has a fixed
+size and only its shape is rewritten; the manifest is written last, so rows of an interrupted append are ignored.
+
+  python app_cli.py inventory.csv --store results/   (appends to the store)
+  store = ResultStore("results"); store["RSA_UF"].mean()
+  python app_store.py results/                       (summary of the store)
+"""
+
+import datetime
+import json
+import os
+import sys
+import uuid
+
+import numpy as np
+
+import app_calc as ac
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+DTYPE = np.dtype("<f8")
+HEADER_SIZE = 128 # [B] fixed .npy header, room for any shape of a column
+SUMMARY_CHUNK = 1 << 20 # rows of a column read at once by summary()
+
+
+class StoreError(ValueError):
+    """ Store of unsupported format or with other columns. """
+
+
+def _npy_header(rows):
+    """ .npy (version 1.0) header of the float64 column with the given number of rows, padded to HEADER_SIZE. """
+    header = repr({"descr": DTYPE.str, "fortran_order": False, "shape": (rows,)})
+    padding = HEADER_SIZE - len(np.lib.format.MAGIC_PREFIX) - 2 - 2 - len(header) - 1
+
+    return np.lib.format.magic(1, 0) + np.uint16(HEADER_SIZE - 10).tobytes() + header.encode("latin-1") + b" " * padding + b"\n"
+
+
+class ResultStore:
+    """ Store in the directory (created by the first append). Columns: names of app_graph.INPUTS and outputs.
+    Every opened ResultStore is one session with its own run_id (new one by default): appends of the session make
+    its runs, another session (e.g. next app_cli invocation with the same source) always starts a new run. """
+
+    def __init__(self, path, run_id=None):
+        self.path = path
+        self.run_id = run_id or uuid.uuid4().hex
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as file:
+                self.manifest = json.load(file)
+            if self.manifest.get("format_version") != FORMAT_VERSION:
+                raise StoreError(f"unsupported format of the store {path}: {self.manifest.get('format_version')}")
+        else:
+            self.manifest = {"format_version": FORMAT_VERSION, "rows": 0, "columns": [], "runs": []}
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    @property
+    def columns(self):
+        return list(self.manifest["columns"])
+
+    @property
+    def runs(self):
+        return list(self.manifest["runs"])
+
+    def column(self, name):
+        """ Read-only memory-mapped column (rows of finished appends only). """
+        if name not in self.manifest["columns"]:
+            raise KeyError(name)
+        if not len(self):
+            return np.empty(0, dtype=DTYPE)
+
+        return np.load(self._column_path(name), mmap_mode="r")[:len(self)]
+
+    __getitem__ = column
+
+    def append(self, columns, run=None):
+        """ Appends the rows of the columns (dict {name: 1-D array}, all of the same length and the same names
+        as the previous appends). run: dict of information about the source (file, constants...), appended rows
+        are added to the last run of this session with the same information or make a new one. """
+        columns = {name: np.asarray(values, dtype=DTYPE).ravel() for name, values in columns.items()}
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) != 1:
+            raise ValueError("columns of different lengths")
+        if self.manifest["columns"] and set(columns) != set(self.manifest["columns"]):
+            raise StoreError(f"columns differ from the store: {sorted(set(columns) ^ set(self.manifest['columns']))}")
+        rows = lengths.pop()
+        if not rows:
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        start = len(self)
+        for name, values in columns.items():
+            self._append_column(name, values, start)
+        self.manifest["columns"] = self.manifest["columns"] or list(columns)
+        self.manifest["rows"] = start + rows
+        self._add_run(run or {}, start, rows)
+        self._write_manifest()
+
+    def _append_column(self, name, values, start):
+        path = self._column_path(name)
+        with open(path, "r+b" if start else "wb") as file:
+            file.seek(HEADER_SIZE + start * DTYPE.itemsize) # rows of an interrupted append are overwritten
+            values.tofile(file)
+            file.truncate()
+            file.seek(0)
+            file.write(_npy_header(start + len(values)))
+
+    def _add_run(self, run, start, rows):
+        runs = self.manifest["runs"]
+        if runs and runs[-1].get("run_id") == self.run_id and runs[-1]["info"] == run and \
+           runs[-1]["start"] + runs[-1]["rows"] == start:
+            runs[-1]["rows"] += rows
+            return
+        runs.append({"start": start, "rows": rows, "run_id": self.run_id, "info": run, "algorithm_version": ac.ALGORITHM_VERSION,
+                     "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")})
+
+    def _write_manifest(self):
+        path = os.path.join(self.path, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, indent=1, ensure_ascii=False)
+        os.replace(path + ".tmp", path) # readers never see a partial manifest
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f"{name}.npy")
+
+    def summary(self):
+        """ {column: (min, mean, max)} of the finite values, read in chunks (memory use does not depend on the size). """
+        result = {}
+        for name in self.columns:
+            column = self.column(name)
+            minimum, maximum, total, count = np.inf, -np.inf, 0.0, 0
+            for offset in range(0, len(column), SUMMARY_CHUNK):
+                values = np.asarray(column[offset:offset + SUMMARY_CHUNK])
+                values = values[np.isfinite(values)]
+                if values.size:
+                    minimum, maximum = min(minimum, values.min()), max(maximum, values.max())
+                    total += values.sum()
+                    count += values.size
+            result[name] = (minimum, total / count, maximum) if count else (np.nan, np.nan, np.nan)
+
+        return result
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python app_store.py STORE_DIRECTORY", file=sys.stderr)
+        return 2
+
+    store = ResultStore(argv[0])
+    print(f"{len(store)} rows, {len(store.runs)} runs")
+    for run in store.runs:
+        print(f"  {run['created']} {run.get('run_id', '-')[:8]}: rows {run['start']}-{run['start'] + run['rows'] - 1} "
+              f"{json.dumps(run['info'], ensure_ascii=False)}")
+    for name, (minimum, mean, maximum) in store.summary().items():
+        print(f"{name:>20}: min {minimum:.6g}, mean {mean:.6g}, max {maximum:.6g}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed tables of lambda for the probability levels offered in GUI and the whole GUI range of aggregation.
+
+Running this module generates the versioned binary file (data/lambda_tables.bin):
+  python app_tables.py [path]
+app_calc maps the file into memory lazily and uses it for O(1) lookup of calculate_lambda_div and calculate_lambda_simple,
+anything out of the tables is solved as usual. The mapping is read-only, so more (worker) processes share the same pages.
+
+File layout (little endian):
+  header (64 bytes): magic, format version, algorithm version of app_calc, number of probability levels, maximal aggregation
+  probability levels: float64[levels]
+  tables: float64[agg_max + 1] for each kind ("div", "simple") and each probability level, index is the aggregation (k)
+"""
+
+import os
+import struct
+import sys
+import time
+
+import app_calc as ac
+
+MAGIC = b"NCLAMBDA"
+FORMAT_VERSION = 3
+HEADER = struct.Struct("<8sIIII")
+HEADER_SIZE = 64
+
+PROBABILITY_LEVELS = (0.90, 0.95) # items of probability ComboBox
+AGG_MAX = 99999 # maximum of agg SpinBox
+KINDS = ("div", "simple")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lambda_tables.bin")
+
+
+class LambdaTables:
+    """ Memory-mapped lambda tables (read-only). """
+
+    def __init__(self, path):
+        import numpy as np
+
+        with open(path, "rb") as file:
+            magic, format_version, algorithm_version, levels_count, agg_max = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"Not a lambda tables file (version {FORMAT_VERSION}): {path}")
+
+        self.path = path
+        self.algorithm_version = algorithm_version
+        self.agg_max = agg_max
+        self.levels = np.memmap(path, dtype="<f8", mode="r", offset=HEADER_SIZE, shape=(levels_count,))
+        self.tables = np.memmap(path, dtype="<f8", mode="r", offset=HEADER_SIZE + 8 * levels_count,
+                                shape=(len(KINDS), levels_count, agg_max + 1))
+        self._level_index = {round(float(level), 6): i for i, level in enumerate(self.levels)}
+
+    def lookup(self, kind, prob, agg):
+        """ Tabulated lambda or None when the inputs are out of the tables. """
+        level = self._level_index.get(round(prob, 6))
+        if level is None or kind not in KINDS or not (0 <= agg <= self.agg_max) or agg != int(agg):
+            return None
+        x_lambda = float(self.tables[KINDS.index(kind), level, int(agg)])
+
+        return None if x_lambda != x_lambda else x_lambda # nan = not tabulated
+
+    def lookup_many(self, kind, prob, agg):
+        """ Vectorized lookup, nan where the inputs are out of the tables. """
+        import numpy as np
+
+        prob = np.asarray(prob, dtype=float)
+        agg = np.asarray(agg, dtype=float)
+        result = np.full(prob.shape, np.nan)
+        if kind not in KINDS:
+            return result
+
+        valid = (agg >= 0) & (agg <= self.agg_max) & (np.floor(agg) == agg)
+        prob_rounded = np.round(prob, 6)
+        for rounded_level, level in self._level_index.items():
+            rows = valid & (prob_rounded == rounded_level)
+            result[rows] = self.tables[KINDS.index(kind), level, agg[rows].astype(np.int64)]
+
+        return result
+
+
+def open_tables(path=DEFAULT_PATH):
+    """ Opens the tables, None when the file is missing or it was generated by another algorithm version. """
+    try:
+        tables = LambdaTables(path)
+    except (OSError, ValueError):
+        return None
+
+    return tables if tables.algorithm_version == ac.ALGORITHM_VERSION else None
+
+
+def generate_tables(path=DEFAULT_PATH, levels=PROBABILITY_LEVELS, agg_max=AGG_MAX):
+    """ Solves all the lambdas (vectorized, default method of app_calc) and writes the tables file. """
+    import numpy as np
+    import app_batch as ab
+
+    agg = np.arange(agg_max + 1, dtype=float)
+    tables = np.full((len(KINDS), len(levels), agg_max + 1), np.nan)
+    for level, prob in enumerate(levels):
+        prob_column = np.full(agg_max, prob)
+        tables[0, level, 1:] = ab._lambda_div_unique(prob_column, agg[1:], "bracket") # agg 0 has no meaning
+        tables[1, level, :] = ab._lambda_simple_unique(np.full(agg_max + 1, prob), agg, "bracket")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, ac.ALGORITHM_VERSION, len(levels), agg_max).ljust(HEADER_SIZE, b"\0"))
+        file.write(np.asarray(levels, dtype="<f8").tobytes())
+        file.write(tables.astype("<f8").tobytes())
+    os.replace(temporary_path, path) # running processes keep their old mapping
+
+    return path
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    output_path = generate_tables(*sys.argv[1:2])
+    print(f"Lambda tables written to {output_path} in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in trace of the application startup: timestamps of the launch phases up to the first shown frame and the first
+results, written to a JSON file for tracking of startup regressions (between releases, one-file and folder builds).
+
+Turned on by the environment variable NETCALC_STARTUP_TRACE=file.json or by the argument --startup-trace file.json
+of app.py. Times are in seconds from the creation of the process (as reported by the operating system; from the start
+of the tracing when not available), the one-file build reports also the creation of its unpacking bootloader process
+(bootloader_started, negative: before the process of the app). This module uses only the standard library, so it can
+be imported before anything else.
+
+  python app_trace.py old.json new.json   (comparison of the phases of two traces, e.g. releases or builds)
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+
+ENVIRONMENT_VARIABLE = "NETCALC_STARTUP_TRACE"
+ARGUMENT = "--startup-trace"
+FORMAT_VERSION = 1
+
+_trace = None
+
+
+def _process_created(pid):
+    """ Creation time of the process (seconds since the epoch) or None when it can not be found out. """
+    try:
+        if sys.platform.startswith("linux"):
+            with open(f"/proc/{pid}/stat") as file:
+                start_ticks = int(file.read().rsplit(")", 1)[1].split()[19]) # field 22, after the command in brackets
+            with open("/proc/uptime") as file:
+                uptime = float(file.read().split()[0]) # (boot time in /proc/stat has whole seconds only)
+            return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK")) # now - age of the process
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+            if not handle:
+                return None
+            try:
+                times = [ctypes.c_ulonglong() for _ in range(4)] # creation, exit, kernel, user (FILETIME, 100 ns)
+                if not kernel32.GetProcessTimes(handle, *(ctypes.byref(value) for value in times)):
+                    return None
+                return times[0].value / 1e7 - 11644473600 # from 1601 to the Unix epoch
+            finally:
+                kernel32.CloseHandle(handle)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    return None
+
+def build_type():
+    """ "source", "onefile" or "folder" (PyInstaller builds). """
+    if not getattr(sys, "frozen", False):
+        return "source"
+    # one-file build is unpacked into a temporary directory outside of the directory of the executable
+    bundle = os.path.abspath(getattr(sys, "_MEIPASS", os.path.dirname(sys.executable)))
+    executable_dir = os.path.dirname(os.path.abspath(sys.executable))
+
+    return "folder" if bundle == executable_dir or bundle.startswith(executable_dir + os.sep) else "onefile"
+
+
+class StartupTrace:
+    """ Marks of the startup phases (thread safe), written once by write(). """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time() - time.perf_counter() # epoch time of perf_counter zero
+        self.marks = []
+        self.written = False
+        self._lock = threading.Lock()
+        self.mark("trace_started")
+
+    def mark(self, phase):
+        with self._lock:
+            self.marks.append((phase, time.perf_counter(), threading.current_thread().name))
+
+    def report(self):
+        """ Dict of the trace (content of the file). """
+        import platform # (imports needed only for writing of the trace are not paid by every start)
+        created = _process_created(os.getpid())
+        origin = created if created is not None else self.started + self.marks[0][1]
+        bootloader_created = _process_created(os.getppid()) if build_type() == "onefile" else None
+        phases = []
+        previous = 0.0
+        with self._lock:
+            for phase, counter, thread in self.marks:
+                offset = self.started + counter - origin
+                phases.append({"phase": phase, "time": round(offset, 6), "delta": round(offset - previous, 6), "thread": thread})
+                previous = offset
+
+        return {
+            "format_version": FORMAT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "build": build_type(),
+            "executable": sys.executable,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "origin": "process_created" if created is not None else "trace_started",
+            "bootloader_started": None if bootloader_created is None else round(bootloader_created - origin, 6),
+            "phases": phases,
+        }
+
+    def write(self):
+        """ Writes the trace file (only once, further calls do nothing). """
+        with self._lock:
+            if self.written:
+                return
+            self.written = True
+        import json
+        try:
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(self.report(), file, indent=1)
+        except OSError as exception:
+            print(f"startup trace not written: {exception}", file=sys.stderr)
+
+
+def enable(path):
+    """ Starts the tracing into the file, the trace is written by finish() or at exit at the latest. """
+    global _trace
+    _trace = StartupTrace(path)
+    atexit.register(_trace.write)
+
+    return _trace
+
+def enable_from_environment(argv=None):
+    """ Starts the tracing when requested by the environment variable or by the argument (removed from argv). """
+    argv = sys.argv if argv is None else argv
+    path = os.environ.get(ENVIRONMENT_VARIABLE)
+    if ARGUMENT in argv:
+        index = argv.index(ARGUMENT)
+        if index + 1 < len(argv):
+            path = argv[index + 1]
+        del argv[index:index + 2]
+    if path:
+        enable(path)
+
+def mark(phase):
+    """ Marks the end of the startup phase (does nothing when the tracing is off). """
+    if _trace is not None:
+        _trace.mark(phase)
+
+def finish(phase="finished"):
+    """ Marks the last phase and writes the trace (once). """
+    if _trace is not None and not _trace.written:
+        _trace.mark(phase)
+        _trace.write()
+
+def active():
+    return _trace is not None and not _trace.written
+
+
+def compare(old, new):
+    """ Lines comparing the phase times of two traces (dicts of the trace files). """
+    old_phases = {phase["phase"]: phase["time"] for phase in old["phases"]}
+    lines = [f"{'phase':>28} {'old':>9} {'new':>9} {'change':>9}  ({old['build']} -> {new['build']})"]
+    for phase in new["phases"]:
+        name, time_new = phase["phase"], phase["time"]
+        time_old = old_phases.get(name)
+        change = "" if time_old is None else f"{time_new - time_old:+9.3f}"
+        lines.append(f"{name:>28} {'' if time_old is None else f'{time_old:9.3f}':>9} {time_new:9.3f} {change:>9}")
+
+    return lines
+
+
+if __name__ == "__main__":
+    import json
+    if len(sys.argv) != 3:
+        sys.exit("usage: python app_trace.py OLD_TRACE.json NEW_TRACE.json")
+    traces = []
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as file:
+            traces.append(json.load(file))
+    print("\n".join(compare(*traces)))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Calculations running outside of the Qt GUI thread.
+
+Every submitted set of inputs gets a generation number. Jobs run one after another in a single background thread
+(QThreadPool with one thread, the calculation graphs are not shared between threads), a job superseded by a newer
+generation before it started is skipped and results of superseded generations are marked so that GUI can drop them.
+
+The outputs are calculated in precision tiers (PROGRESSIVE_TIERS): with coarse lambdas first, these results are shown
+immediately (those whose shown digits the error of the coarse lambdas can change are marked as provisional), then the
+full precision ones replace them (refining of a superseded generation is skipped). When all the lambdas are found in
+the precomputed tables or caches, the final results are shown at once without the coarse tiers.
+
+The goal seek of the largest aggregation (app_calc.max_aggregation_*) runs as a job of the same thread.
+
+With diagnostics, the lambda lookups of each job are recorded (app_calc.solver_trace) and reported by diagnosed signal.
+"""
+
+import functools
+import threading
+import time
+
+from PyQt6.QtCore import QObject, QThreadPool, pyqtSignal
+
+import app_calc as ac
+import app_graph as ag
+
+# precision tiers of lambdas (app_calc.PRECISION_TIERS) calculated one after another for every input change,
+# only the last one is final; ("full",) turns the progressive results off
+PROGRESSIVE_TIERS = ("coarse", "full")
+
+
+class CalculationWorker(QObject):
+    """ Recalculates the calculation graph in the background thread, finished(generation, outputs, final, provisional)
+    is emitted for each precision tier (receiving slots run in GUI thread): the coarse tiers with values of the outputs
+    waiting for lambdas, the final one with values of all outputs. provisional: names of the outputs whose shown
+    values may still change with the full precision lambdas (empty list for the final results). """
+
+    finished = pyqtSignal(int, dict, bool, list)
+    diagnosed = pyqtSignal(int, list, float) # generation, app_calc.SolverCalls of all tiers, duration of the job [s]
+    # inputs of the goal seek, {"noUF"/"UF": app_calc.GoalSeekResult or app_graph.CalculationError}
+    goal_sought = pyqtSignal(dict, dict)
+
+    def __init__(self, parent=None, tiers=None, diagnostics=False):
+        super().__init__(parent)
+        self.diagnostics = diagnostics
+        self.tiers = tiers or PROGRESSIVE_TIERS
+        self.graphs = [ag.CalculationGraph(ag.build_nodes(ac.PRECISION_TIERS[tier])) for tier in self.tiers]
+        self.graph = self.graphs[-1] # full precision
+        self.generation = 0 # generation of the last submitted inputs
+        self._generation_lock = threading.Lock()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1) # jobs are serialized, so the graphs are used by one thread only
+
+    def submit(self, inputs):
+        """ Queues recalculation for the (complete) input values, returns its generation number. """
+        with self._generation_lock:
+            self.generation += 1
+            generation = self.generation
+        self._pool.start(functools.partial(self._run, generation, dict(inputs)))
+
+        return generation
+
+    def seek_max_aggregation(self, inputs, max_agg=ac.GOAL_SEEK_MAX_AGG):
+        """ Queues the goal seek of the largest aggregation meeting the required SDR for the (complete) input values,
+        its results are emitted by goal_sought. """
+        self._pool.start(functools.partial(self._seek, dict(inputs), max_agg))
+
+    def is_current(self, generation):
+        """ True when no newer inputs were submitted after the generation. """
+        return generation == self.generation
+
+    def wait(self, msecs=-1):
+        """ Waits till all the queued jobs are done (for closing of the window and for headless use). """
+        return self._pool.waitForDone(msecs)
+
+    def _run(self, generation, inputs):
+        if not self.diagnostics:
+            self._update(generation, inputs)
+            return
+        start = time.perf_counter()
+        with ac.solver_trace() as calls:
+            self._update(generation, inputs)
+        self.diagnosed.emit(generation, calls, time.perf_counter() - start)
+
+    def _seek(self, inputs, max_agg):
+        link = {name: inputs[name] for name in ("capacity_L1", "mtu", "ipheader", "prob", "rsa_req")}
+        variants = {"noUF": functools.partial(ac.max_aggregation_noUF, **link),
+                    "UF": functools.partial(ac.max_aggregation_UF, nbr_max=inputs["nbr_max"], nbr_avg=inputs["nbr_avg"], **link)}
+        results = {}
+        for variant, seek in variants.items():
+            try:
+                results[variant] = seek(max_agg=max_agg)
+            except (ArithmeticError, ValueError) as exception: # degenerate inputs, e.g. zero NBR at L4 (MTU 60 B with IPv6)
+                results[variant] = ag.CalculationError(exception)
+        self.goal_sought.emit(inputs, results)
+
+    def _update(self, generation, inputs):
+        if not self.is_current(generation):
+            return # superseded before start, the newer job brings all its inputs
+        with ac.cached_only(): # final results at once when all their lambdas are in the tables or caches
+            self.graph.update(inputs)
+        pending = self.graph.pending_outputs()
+        if pending:
+            for tier, graph in zip(self.tiers, self.graphs[:-1]):
+                graph.update(inputs)
+                # only the outputs waiting for lambdas, the others are final already (no flicker of coarse values)
+                self.finished.emit(generation, {name: graph.values[name] for name in pending}, False,
+                                   graph.provisional_outputs(ac.PRECISION_TIERS[tier], pending))
+                if not self.is_current(generation):
+                    return # superseded before refining (the pending nodes are evaluated by the next update)
+            self.graph.update(inputs) # (full precision lambdas are searched from the bracket of the coarse ones)
+        self.finished.emit(generation, {name: self.graph.values[name] for name in self.graph.outputs}, True, [])
@@ -1,16 +1,17 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
 
 a = Analysis(
     ['app.py'],
     pathex=[],
     binaries=[],
-    datas=[('img', 'img')],
+    datas=[('img', 'img')] + ([('data', 'data')] if os.path.isdir('data') else []), # data: lambda tables (python app_tables.py)
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['scipy.stats'], # not used (app_calc needs only scipy.special), most of the size of scipy
     noarchive=False,
 )
 pyz = PYZ(a.pure)
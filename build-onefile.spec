@@ -1,4 +1,5 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
 
 a = Analysis(
@@ -6,12 +7,12 @@ a = Analysis(
     pathex=[],
     binaries=[],
     #datas=[('img/logo_ctu_cz.ico', '.'), ('img/logo_ctu_cz_cb.png', '.')],
-    datas=[('img', 'img')],
+    datas=[('img', 'img')] + ([('data', 'data')] if os.path.isdir('data') else []), # data: lambda tables (python app_tables.py)
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['scipy.stats'], # not used (app_calc needs only scipy.special), most of the size of scipy
     noarchive=False,
 )
 pyz = PYZ(a.pure)